@@ -1,18 +1,14 @@
 # Imports
-import Visualizations  
+import config
+import wallet_cache
 import streamlit as st 
-import os
-from dotenv import load_dotenv, find_dotenv  
+from datetime import datetime, timedelta, timezone
 
-# Load environment variables from .env file
-dotenv_path = find_dotenv()  
-if dotenv_path:
-    load_dotenv(dotenv_path)
-else:
-    raise FileNotFoundError(".env file not found. Please ensure it's present in the project directory.")
+# Load settings from the environment and from a .env file, if there is one
+config.Load()
 
-# Get Etherscan API key from environment
-Etherscan_API_Key = os.getenv("Etherscan_API_Key")
+# Get Etherscan API key from the settings
+Etherscan_API_Key = config.Get("Etherscan_API_Key")
 
 # Streamlit app title
 st.title("Ethereum Wallet Behavior Explorer")
@@ -20,7 +16,19 @@ st.title("Ethereum Wallet Behavior Explorer")
 # Input field for Ethereum wallet address
 Address = st.text_input("Enter Wallet Address:")
 
+if not Etherscan_API_Key:
+    st.warning("Etherscan_API_Key is not set: add it to the environment or to a .env file (see .env.example).")
+
+# Time windows offered for the charts, in days (None = the whole history)
+Time_Windows = {"All time": None, "Last 7 days": 7, "Last 30 days": 30, "Last 90 days": 90, "Last year": 365}
+
 if Address:
+    # Dropdown to limit the analysis to a recent time window; only that slice of history is downloaded
+    time_window = st.selectbox("Time Window", list(Time_Windows), key="time_window_select")
+    StartDate = None
+    if Time_Windows[time_window] is not None:
+        StartDate = datetime.now(timezone.utc).date() - timedelta(days=Time_Windows[time_window] - 1)
+
     # Dropdown to choose between ETH and ERC-20 tokens
     asset_type = st.selectbox(
         "Select Asset Type",
@@ -43,16 +51,24 @@ if Address:
         if display_value is None:
             st.info("🔍 Please select a value format above to load the charts.")
         else:
+            # The charts (and the pandas, Plotly and API code behind them) are only imported once a view
+            # is drawn, so the page itself comes up quickly
+            import Visualizations
+
             # Render appropriate visualizations based on asset type and display value
             if asset_type == "ETH":
                 if display_value == "USD":
-                    Visualizations.USD_Charts(Address, Etherscan_API_Key)
+                    Visualizations.USD_Charts(Address, Etherscan_API_Key, StartDate)
                 elif display_value == "Token":
-                    Visualizations.ETH_Charts(Address, Etherscan_API_Key)
+                    Visualizations.ETH_Charts(Address, Etherscan_API_Key, StartDate)
             elif asset_type == "ERC-20":
                 if display_value == "USD":
-                    Visualizations.ERC_20_Charts_USD(Address, Etherscan_API_Key)
+                    Visualizations.ERC_20_Charts_USD(Address, Etherscan_API_Key, StartDate)
                 elif display_value == "Token":
-                    Visualizations.ERC_20_Charts(Address, Etherscan_API_Key)
+                    Visualizations.ERC_20_Charts(Address, Etherscan_API_Key, StartDate)
 else:
     st.info("🔍 Please enter a valid Ethereum address above.")
+
+# Shared wallet cache counters, used to size Wallet_Cache_MB
+with st.sidebar.expander("Cache statistics"):
+    st.json(wallet_cache.GetWalletCache().Stats())
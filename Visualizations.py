@@ -1,38 +1,148 @@
 # Imports
 import wallet_utils
+import chart_data
+import pandas as pd
 import plotly.express as px
 import streamlit as st
-import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Background threads for Gemini summaries, shared by every session
+_Summary_Pool = ThreadPoolExecutor(max_workers=4)
+
+# Wallet snapshot kept in the user's session, so reruns (dropdown changes, view switches) reuse downloaded data
+def _GetSessionSnapshot(Address, Apikey, StartDate=None, EndDate=None):
+    Snapshot = st.session_state.get("wallet_snapshot")
+    if (Snapshot is None or Snapshot.Address.lower() != Address.lower()
+            or (Snapshot.StartDate, Snapshot.EndDate) != (StartDate, EndDate)):
+        Snapshot = wallet_utils.WalletSnapshot(Address, Apikey, StartDate=StartDate, EndDate=EndDate)
+        st.session_state["wallet_snapshot"] = Snapshot
+    return Snapshot
+
+# Show the AI summary section and return a callable that completes it once the rest of the page is drawn.
+# A cached Gemini summary is shown straight away; otherwise the local rule-based summary is shown while
+# Gemini answers in the background, and the callable swaps the Gemini text in when it arrives.
+def _StartWalletSummary(Snapshot):
+    st.subheader("AI Powered Wallet Summary", divider="blue")
+    _StreamHistory(Snapshot, "txlist", "ETH")
+    placeholder = st.empty()
+
+    Metrics = Snapshot.Metrics
+    age, activity, volume = Metrics["Age"], Metrics["Tx Per Day"], Metrics["Volume"]
+
+    if not wallet_utils.UseGeminiSummaries():
+        placeholder.text(wallet_utils.classify_wallet_locally(age, activity, volume))
+        return lambda: None
+
+    Summary = wallet_utils.GetCachedWalletSummary(age, activity, volume)
+    if Summary is not None:
+        placeholder.text(Summary)
+        return lambda: None
+
+    placeholder.text(wallet_utils.classify_wallet_locally(age, activity, volume))
+    future = _Summary_Pool.submit(wallet_utils.classify_wallet_with_gemini, age, activity, volume)
+
+    def FinishSummary():
+        try:
+            placeholder.text(future.result())
+        except Exception as e:
+            print(f"Gemini summary failed: {e}")
+
+    return FinishSummary
+
+# Note how many of the wallet's tokens were hidden as spam
+def _SpamCaption(Snapshot):
+    hidden = len(Snapshot.ERC20Rollup.Assets) - len(Snapshot.RealTokens)
+    if hidden:
+        st.caption(f"{hidden} likely spam or airdrop token(s) hidden")
+
+# Build the snapshot's rollup for Action while its history downloads, redrawing a progress bar, running
+# totals and a transfers-per-day preview in place after every page, so a large wallet shows data within
+# seconds. Leaving the page or switching wallets stops the download; pages already fetched stay in the
+# local store. Does nothing once the rollup is built.
+def _StreamHistory(Snapshot, Action, Label):
+    progress = totals = preview = None
+    previous = None
+    today = pd.Timestamp.now().normalize()
+
+    for i, rollup in enumerate(Snapshot.IterRollup(Action)):
+        if rollup.LastBlock == previous:
+            continue
+        daily = rollup.DailyTotals()
+        if daily.empty:
+            continue
+        previous = rollup.LastBlock
+        if progress is None:
+            progress, totals, preview = st.progress(0.0), st.empty(), st.empty()
+
+        first, last = daily.index.min(), daily.index.max()
+        done = (last - first) / (today - first) if today > first else 1.0
+        progress.progress(min(max(done, 0.0), 1.0), text=f"Loading {Label} history: up to {last.date()}")
+        totals.caption(
+            f"{int(daily['Tx Count'].sum()):,} transfers of {len(rollup.Assets)} asset(s) since {first.date()}"
+        )
+
+        counts = chart_data.Downsample(daily[["Tx Count"]], chart_data.GetPointBudget())
+        fig = px.line(
+            counts, x=counts.index, y="Tx Count",
+            labels={"Tx Count": "Transfers", "Date": "Date"},
+            title=f"{Label} Transfers per Day (loading...)"
+        )
+        preview.plotly_chart(fig, use_container_width=True, key=f"preview_{Action}_{i}")
+
+    if progress is not None:
+        progress.empty()
+        totals.empty()
+        preview.empty()
+
+# Line chart data for the window picked on a zoom slider (Key identifies the slider): daily totals for wide
+# windows and individual transfers for windows up to Raw_Points_Max_Days long, downsampled to the point
+# budget either way. Returns the data and its resolution ("Daily" or "Per-Transfer").
+def _ZoomedChartData(Snapshot, Action, Rollup, Assets, Key):
+    daily = chart_data.DailyChartData(Rollup, Assets)
+    if len(daily) < 2:
+        return daily, "Daily"
+
+    first, last = daily.index.min().date(), daily.index.max().date()
+    start, end = st.slider("Zoom", min_value=first, max_value=last, value=(first, last), key=Key)
+
+    if (end - start).days + 1 <= chart_data.GetRawPointsMaxDays():
+        data = wallet_utils.GetTransferPoints(Snapshot, Action, start, end, Assets)
+        resolution = "Per-Transfer"
+    else:
+        data = daily.loc[str(start):str(end)]
+        resolution = "Daily"
+
+    if data.empty:
+        # Nothing moved in the zoomed range: draw it as a flat line
+        data = pd.DataFrame(0.0, index=pd.DatetimeIndex([start, end], name="Date"), columns=daily.columns)
+
+    return chart_data.Downsample(data, chart_data.GetPointBudget()), resolution
 
 # Display ETH transaction charts, net flow, and AI summary in USD
-def USD_Charts(Address,Apikey):
-    chart_data = wallet_utils.GetWalletTransactions(Address, Apikey)[
-        ["Date", "Transaction Value", "Transaction Fee"]
-    ]
-    chart_data = chart_data.set_index("Date")
+def USD_Charts(Address, Apikey, StartDate=None, EndDate=None):
+    Snapshot = _GetSessionSnapshot(Address, Apikey, StartDate, EndDate)
     
     # --- USD Wallet Balance ---
-    Balance = wallet_utils.GetWalletBalance(Address, Apikey)*wallet_utils.GetCurrentUSDETHPrice(Apikey)
+    CurrentExchangeRate = wallet_utils.GetCurrentUSDETHPrice(Apikey)
+    Balance = Snapshot.Balance*CurrentExchangeRate
     st.subheader(f"Wallet Balance: :blue[${Balance:,.2f} USD] ")
+
+    _StreamHistory(Snapshot, "txlist", "ETH")
+    daily_data = chart_data.DailyChartData(Snapshot.Rollup)
     
     # --- AI Wallet Summary ---
-    age = wallet_utils.GetWalletAge(Address, Apikey)
-    activity = wallet_utils.Gettxperday(Address, Apikey)
-    volume = wallet_utils.GetVolume(Address, Apikey)
-    
-    Summary = wallet_utils.classify_wallet_with_gemini(age, activity, volume)
-    
-    st.subheader("AI Powered Wallet Summary", divider="blue")
-    st.text(Summary)
+    FinishSummary = _StartWalletSummary(Snapshot)
     
     # --- Charts ---
     st.subheader("Charts", divider="blue")
+    if daily_data.empty:
+        st.info("No ETH transfers in the selected time window.")
+        FinishSummary()
+        return
 
     # --- USD Line Chart ---
-    CurrentExchangeRate = wallet_utils.GetCurrentUSDETHPrice(Apikey)
-    usd_data = chart_data.copy()
-    usd_data["Transaction Value"] *= CurrentExchangeRate
-    usd_data["Transaction Fee"]     *= CurrentExchangeRate
+    usd_data, resolution = _ZoomedChartData(Snapshot, "txlist", Snapshot.Rollup, None, "zoom_eth")
+    usd_data = wallet_utils.ToUSD(usd_data, "ETH")
 
     fig_usd = px.line(
     usd_data,
@@ -42,18 +152,17 @@ def USD_Charts(Address,Apikey):
         "value": " USD Volume",
         "Date": " Date ",
     },
-    title="Transaction Values and Fees (USD)"
+    title=f"{resolution} Transaction Values and Fees (USD)"
     )
     
     fig_usd.data[0].hovertemplate = "Date: %{x}<br>Value: %{y:.4f} USD<extra></extra>"
     fig_usd.data[1].hovertemplate = "Date: %{x}<br>Fee: %{y:.6f} USD<extra></extra>"
     
-    fig_usd.update_traces(mode="lines+markers")
+    fig_usd.update_traces(mode=chart_data.GetLineMode(len(usd_data)))
     st.plotly_chart(fig_usd, use_container_width=True)
 
     # --- USD Net-Flow Bar Chart ---
-    net_eth = wallet_utils.GetWalletNetFlow(Address, Apikey)["Transaction Value"]
-    net_usd = net_eth * CurrentExchangeRate
+    net_usd = wallet_utils.ToUSD(wallet_utils.GetWalletNetFlow(Snapshot), "ETH")["Transaction Value"]
     fig_usd_net = px.bar(
     x=net_usd.index,
     y=net_usd.values,
@@ -65,13 +174,7 @@ def USD_Charts(Address,Apikey):
     # --- USD Treemaps ---
     tab1, tab2 = st.tabs(["Receivers", "Senders"])
     with tab1:
-        top_recv = (
-            wallet_utils.WalletTopReceiversSenders(Address, Apikey)
-            .nlargest(10, "Incoming Transaction Values")
-            .copy() 
-        )
-
-        top_recv["Incoming Transaction Values"] *=CurrentExchangeRate
+        top_recv = wallet_utils.WalletTopCounterparties(Snapshot, "Incoming", USD=True)
         fig_recv = px.treemap(
             top_recv,
             path=["Wallet"],
@@ -88,12 +191,7 @@ def USD_Charts(Address,Apikey):
         st.plotly_chart(fig_recv, use_container_width=True)
 
     with tab2:
-        top_send = (
-            wallet_utils.WalletTopReceiversSenders(Address, Apikey)
-            .nlargest(10, "Outgoing Transaction Values")
-            .copy()
-        )
-        top_send["Outgoing Transaction Values"] *=CurrentExchangeRate
+        top_send = wallet_utils.WalletTopCounterparties(Snapshot, "Outgoing", USD=True)
         fig_send = px.treemap(
             top_send,
             path=["Wallet"],
@@ -109,50 +207,50 @@ def USD_Charts(Address,Apikey):
         )
         st.plotly_chart(fig_send, use_container_width=True)
 
+    FinishSummary()
+
 # Display ETH transaction charts, net flow, and AI summary in ETH
-def ETH_Charts(Address,Apikey):
-    chart_data = wallet_utils.GetWalletTransactions(Address, Apikey)[
-        ["Date", "Transaction Value", "Transaction Fee"]
-    ]
-    chart_data = chart_data.set_index("Date")
+def ETH_Charts(Address, Apikey, StartDate=None, EndDate=None):
+    Snapshot = _GetSessionSnapshot(Address, Apikey, StartDate, EndDate)
     
     # --- ETH Wallet Balance ---
-    Balance = wallet_utils.GetWalletBalance(Address, Apikey)
+    Balance = Snapshot.Balance
     st.subheader(f"Wallet Balance: :blue[{Balance:,.6f} ETH] ")
+
+    _StreamHistory(Snapshot, "txlist", "ETH")
+    daily_data = chart_data.DailyChartData(Snapshot.Rollup)
     
     # --- AI Wallet Summary ---
-    age = wallet_utils.GetWalletAge(Address, Apikey)
-    activity = wallet_utils.Gettxperday(Address, Apikey)
-    volume = wallet_utils.GetVolume(Address, Apikey)
-    
-    Summary = wallet_utils.classify_wallet_with_gemini(age, activity, volume)
-    
-    st.subheader("AI Powered Wallet Summary", divider="blue")
-    st.text(Summary)
+    FinishSummary = _StartWalletSummary(Snapshot)
     
     # --- Charts ---
     st.subheader("Charts", divider="blue")
+    if daily_data.empty:
+        st.info("No ETH transfers in the selected time window.")
+        FinishSummary()
+        return
     
     # --- ETH Line Chart ---
+    eth_data, resolution = _ZoomedChartData(Snapshot, "txlist", Snapshot.Rollup, None, "zoom_eth")
     fig_eth = px.line(
-    chart_data,
-    x=chart_data.index,
+    eth_data,
+    x=eth_data.index,
     y=["Transaction Value", "Transaction Fee"],
     labels={
         "value": " ETH Volume",
         "Date": " Date ",
     },
-    title="Transaction Values and Fees (ETH)"
+    title=f"{resolution} Transaction Values and Fees (ETH)"
     )
     
     fig_eth.data[0].hovertemplate = "Date: %{x}<br>Value: %{y:.4f} ETH<extra></extra>"
     fig_eth.data[1].hovertemplate = "Date: %{x}<br>Fee: %{y:.6f} ETH<extra></extra>"
     
-    fig_eth.update_traces(mode="lines+markers")
+    fig_eth.update_traces(mode=chart_data.GetLineMode(len(eth_data)))
     st.plotly_chart(fig_eth, use_container_width=True)
 
     # --- ETH Net-Flow Bar Chart ---
-    net = wallet_utils.GetWalletNetFlow(Address, Apikey)
+    net = wallet_utils.GetWalletNetFlow(Snapshot)
     fig_eth_net = px.bar(
     x=net.index,
     y=net["Transaction Value"],
@@ -164,11 +262,7 @@ def ETH_Charts(Address,Apikey):
     # --- ETH Treemaps ---
     tab1, tab2 = st.tabs(["Receivers", "Senders"])
     with tab1:
-        top_recv = (
-            wallet_utils.WalletTopReceiversSenders(Address, Apikey)
-            .nlargest(10, "Incoming Transaction Values")
-            .copy()
-        )
+        top_recv = wallet_utils.WalletTopCounterparties(Snapshot, "Incoming")
         fig_recv = px.treemap(
             top_recv,
             path=["Wallet"],
@@ -185,11 +279,7 @@ def ETH_Charts(Address,Apikey):
         st.plotly_chart(fig_recv, use_container_width=True)
 
     with tab2:
-        top_send = (
-            wallet_utils.WalletTopReceiversSenders(Address, Apikey)
-            .nlargest(10, "Outgoing Transaction Values")
-            .copy()
-        )
+        top_send = wallet_utils.WalletTopCounterparties(Snapshot, "Outgoing")
         fig_send = px.treemap(
             top_send,
             path=["Wallet"],
@@ -205,45 +295,51 @@ def ETH_Charts(Address,Apikey):
         )
         st.plotly_chart(fig_send, use_container_width=True)
 
+    FinishSummary()
+
 # Display ERC-20 balances and transaction charts by token in native units
-def ERC_20_Charts(Address,Apikey):
+def ERC_20_Charts(Address, Apikey, StartDate=None, EndDate=None):
     # --- ERC-20 Wallet Balance ---
     st.subheader("Wallet Balance Per Token")
 
-    Tokens = wallet_utils.GetWalletERC20Transactions(Address, Apikey)
-    token_df = Tokens[["Token Symbol", "Token Name", "Token Decimal", "Contract Address"]].drop_duplicates()
+    Snapshot = _GetSessionSnapshot(Address, Apikey, StartDate, EndDate)
+    _StreamHistory(Snapshot, "tokentx", "ERC-20")
+    Balances = Snapshot.ERC20Balances
+    _SpamCaption(Snapshot)
 
     cols = st.columns(2)  # You can increase to 3 or more if needed
     i = 0
 
-    for _, token in token_df.iterrows():
-        value = wallet_utils.Geterc_20WalletBalance(Address, token["Contract Address"], token["Token Decimal"], Apikey)
-        time.sleep(0.25)
-        if value != 0:
-            with cols[i % len(cols)]:
-                st.markdown(f"**{token['Token Name']}**  \n:blue[{value:,.6f} {token['Token Symbol']}]")
-            i += 1
+    for _, token in Balances[Balances["Raw Balance"] != 0].iterrows():
+        value = token["Balance"]
+        with cols[i % len(cols)]:
+            st.markdown(f"**{token['Token Name']}**  \n:blue[{value:,.6f} {token['Token Symbol']}]")
+        i += 1
             
     # --- AI Wallet Summary ---
-    age = wallet_utils.GetWalletAge(Address, Apikey)
-    activity = wallet_utils.Gettxperday(Address, Apikey)
-    volume = wallet_utils.GetVolume(Address, Apikey)
-    
-    Summary = wallet_utils.classify_wallet_with_gemini(age, activity, volume)
-    
-    st.subheader("AI Powered Wallet Summary", divider="blue")
-    st.text(Summary)
+    FinishSummary = _StartWalletSummary(Snapshot)
     
     # --- Charts ---
     st.subheader("Charts", divider="blue")
+    if len(Snapshot.RealTokens) == 0:
+        st.info("No ERC-20 transfers in the selected time window.")
+        FinishSummary()
+        return
             
+    _ERC20TokenCharts(Snapshot)
+    FinishSummary()
+
+# Token selector and per-token charts; reruns on its own when the selected token changes
+@st.fragment
+def _ERC20TokenCharts(Snapshot):
     # --- ERC-20 Token Selector ---
-    selected_token = st.selectbox("Select Token", Tokens["Token Symbol"].unique())
-    df_filtered = Tokens[Tokens["Token Symbol"] == selected_token]        
+    selected_token = st.selectbox("Select Token", Snapshot.TokenSymbols)
             
     # --- ERC-20 Line Chart ---
-    df = df_filtered[df_filtered["Transaction Value"] > 0].copy()
-    df = df.set_index("Date")
+    df, resolution = _ZoomedChartData(
+        Snapshot, "tokentx", Snapshot.ERC20Rollup, Snapshot.TokenAssets(selected_token),
+        f"zoom_{selected_token}"
+    )
 
     fig_erc_20 = px.line(
     df,
@@ -253,17 +349,17 @@ def ERC_20_Charts(Address,Apikey):
         "value": f"{selected_token} Volume",
         "Date": " Date ",
     },
-    title=f"Daily {selected_token} Token Transaction Volume"
+    title=f"{resolution} {selected_token} Token Transaction Volume"
     )
     
     fig_erc_20.data[0].hovertemplate = "Date: %{x}<br>Value: %{y:.4f}<extra></extra>" + f" {selected_token}"
     fig_erc_20.data[1].hovertemplate = "Date: %{x}<br>Fee: %{y:.6f} ETH<extra></extra>"
     
-    fig_erc_20.update_traces(mode="lines+markers")
+    fig_erc_20.update_traces(mode=chart_data.GetLineMode(len(df)))
     st.plotly_chart(fig_erc_20, use_container_width=True)
     
     # --- ERC-20 Net-Flow Bar Chart ---
-    net = wallet_utils.GetWalletERC20NetFlow(Address, Apikey)[[selected_token]] 
+    net = wallet_utils.GetWalletERC20NetFlow(Snapshot)[[selected_token]] 
     fig_eth_net = px.bar(
     x=net.index,
     y=net[selected_token], 
@@ -275,11 +371,7 @@ def ERC_20_Charts(Address,Apikey):
     # --- ERC-20 Treemaps ---
     tab1, tab2 = st.tabs(["Receivers", "Senders"])
     with tab1:
-        top_recv = (
-            wallet_utils.WalletERC20TopReceiversSenders(Address, Apikey, selected_token)
-            .nlargest(10, "Incoming Transaction Values")
-            .copy()
-        )
+        top_recv = wallet_utils.WalletTopCounterparties(Snapshot, "Incoming", Token=selected_token)
         fig_recv = px.treemap(
             top_recv,
             path=["Wallet"],
@@ -296,11 +388,7 @@ def ERC_20_Charts(Address,Apikey):
         st.plotly_chart(fig_recv, use_container_width=True)
 
     with tab2:
-        top_send = (
-            wallet_utils.WalletERC20TopReceiversSenders(Address, Apikey, selected_token)
-            .nlargest(10, "Outgoing Transaction Values")
-            .copy()
-        )
+        top_send = wallet_utils.WalletTopCounterparties(Snapshot, "Outgoing", Token=selected_token)
         fig_send = px.treemap(
             top_send,
             path=["Wallet"],
@@ -315,78 +403,83 @@ def ERC_20_Charts(Address,Apikey):
             hoverinfo="none"
         )
         st.plotly_chart(fig_send, use_container_width=True)
-    
+
 # Display ERC-20 balances and transaction charts by token in USD
-def ERC_20_Charts_USD(Address, Apikey):
+def ERC_20_Charts_USD(Address, Apikey, StartDate=None, EndDate=None):
 
     st.subheader("Wallet Balance Per Token (in USD)")
 
-    Tokens = wallet_utils.GetWalletERC20Transactions(Address, Apikey)
-    token_df = Tokens[["Token Symbol", "Token Name", "Token Decimal", "Contract Address"]].drop_duplicates()
+    Snapshot = _GetSessionSnapshot(Address, Apikey, StartDate, EndDate)
+    _StreamHistory(Snapshot, "tokentx", "ERC-20")
+    Balances = Snapshot.ERC20Balances
+    _SpamCaption(Snapshot)
 
-    valid_tokens = []
+    Contracts = {}
     cols = st.columns(2)
     i = 0
 
-    for _, token in token_df.iterrows():
+    Held = Balances[Balances["Raw Balance"] != 0]
+    ContractPrices = wallet_utils.GetTokenPrices(Held["Contract Address"])
+
+    for _, token in Held.iterrows():
         symbol = token["Token Symbol"]
-        price = wallet_utils.GetTokenToUSDPrice(symbol)
+        price = ContractPrices.get(token["Contract Address"])
         if price is None:
             continue
 
-        value = wallet_utils.Geterc_20WalletBalance(Address, token["Contract Address"], token["Token Decimal"], Apikey)
-        time.sleep(0.25)
-        if value != 0:
-            usd_value = value * price
-            with cols[i % len(cols)]:
-                st.markdown(f"**{token['Token Name']}**  \n:blue[${usd_value:,.2f} ({value:,.6f} {symbol})]")
-            i += 1
-            valid_tokens.append(symbol)
+        value = token["Balance"]
+        usd_value = value * price
+        with cols[i % len(cols)]:
+            st.markdown(f"**{token['Token Name']}**  \n:blue[${usd_value:,.2f} ({value:,.6f} {symbol})]")
+        i += 1
+        Contracts.setdefault(symbol, token["Contract Address"])
+
+    valid_tokens = list(Contracts)
 
     if not valid_tokens:
         st.warning("No ERC-20 tokens with valid USD pricing found.")
         return
 
     # --- AI Wallet Summary ---
-    age = wallet_utils.GetWalletAge(Address, Apikey)
-    activity = wallet_utils.Gettxperday(Address, Apikey)
-    volume = wallet_utils.GetVolume(Address, Apikey)
-    
-    Summary = wallet_utils.classify_wallet_with_gemini(age, activity, volume)
-    
-    st.subheader("AI Powered Wallet Summary", divider="blue")
-    st.text(Summary)
+    FinishSummary = _StartWalletSummary(Snapshot)
     
     # --- Charts ---
     st.subheader("Charts", divider="blue")
     
+    _ERC20TokenChartsUSD(Snapshot, valid_tokens, Contracts)
+    FinishSummary()
+
+# Token selector and per-token USD charts; reruns on its own when the selected token changes.
+# Amounts are valued at each day's price of the token's priced contract (Contracts maps symbol -> contract),
+# and fees at that day's ETH price since they are paid in ETH.
+@st.fragment
+def _ERC20TokenChartsUSD(Snapshot, valid_tokens, Contracts):
     # --- ERC-20 (in USD) Token Selector ---
     selected_token = st.selectbox("Select Token", valid_tokens)
-    price_usd = wallet_utils.GetTokenToUSDPrice(selected_token)
-    df_filtered = Tokens[Tokens["Token Symbol"] == selected_token].copy()
+    contract = Contracts[selected_token]
 
     # --- ERC-20 (in USD) Line Chart ---
-    df = df_filtered[df_filtered["Transaction Value"] > 0].copy()
-    df["Transaction Value"] *= price_usd
-    df["Transaction Fee"] *= price_usd
-    df = df.set_index("Date")
+    df, resolution = _ZoomedChartData(
+        Snapshot, "tokentx", Snapshot.ERC20Rollup, Snapshot.TokenAssets(selected_token),
+        f"zoom_usd_{selected_token}"
+    )
+    df = wallet_utils.ToUSD(wallet_utils.ToUSD(df, contract, ["Transaction Value"]), "ETH", ["Transaction Fee"])
 
     fig_erc_20 = px.line(
         df,
         x=df.index,
         y=["Transaction Value", "Transaction Fee"],
         labels={"value": f"{selected_token} in USD", "Date": "Date"},
-        title=f"Daily {selected_token} Transaction Volume (in USD)"
+        title=f"{resolution} {selected_token} Transaction Volume (in USD)"
     )
 
     fig_erc_20.data[0].hovertemplate = "Date: %{x}<br>Value: $%{y:,.2f}<extra></extra>"
     fig_erc_20.data[1].hovertemplate = "Date: %{x}<br>Fee: $%{y:,.2f}<extra></extra>"
-    fig_erc_20.update_traces(mode="lines+markers")
+    fig_erc_20.update_traces(mode=chart_data.GetLineMode(len(df)))
     st.plotly_chart(fig_erc_20, use_container_width=True)
 
     # --- ERC-20 (in USD) Net-Flow Bar Chart ---
-    net = wallet_utils.GetWalletERC20NetFlow(Address, Apikey)[[selected_token]].copy()
-    net[selected_token] *= price_usd
+    net = wallet_utils.ToUSD(wallet_utils.GetWalletERC20NetFlow(Snapshot)[[selected_token]], contract)
     fig_eth_net = px.bar(
         x=net.index,
         y=net[selected_token],
@@ -398,12 +491,7 @@ def ERC_20_Charts_USD(Address, Apikey):
     # --- ERC-20 (in USD) Treemaps ---
     tab1, tab2 = st.tabs(["Receivers", "Senders"])
     with tab1:
-        top_recv = (
-            wallet_utils.WalletERC20TopReceiversSenders(Address, Apikey, selected_token)
-            .nlargest(10, "Incoming Transaction Values")
-            .copy()
-        )
-        top_recv["Incoming Transaction Values"] *= price_usd
+        top_recv = wallet_utils.WalletTopCounterparties(Snapshot, "Incoming", Token=selected_token, USD=True)
         fig_recv = px.treemap(
             top_recv,
             path=["Wallet"],
@@ -420,12 +508,7 @@ def ERC_20_Charts_USD(Address, Apikey):
         st.plotly_chart(fig_recv, use_container_width=True)
 
     with tab2:
-        top_send = (
-            wallet_utils.WalletERC20TopReceiversSenders(Address, Apikey, selected_token)
-            .nlargest(10, "Outgoing Transaction Values")
-            .copy()
-        )
-        top_send["Outgoing Transaction Values"] *= price_usd
+        top_send = wallet_utils.WalletTopCounterparties(Snapshot, "Outgoing", Token=selected_token, USD=True)
         fig_send = px.treemap(
             top_send,
             path=["Wallet"],
@@ -440,4 +523,3 @@ def ERC_20_Charts_USD(Address, Apikey):
             hoverinfo="none"
         )
         st.plotly_chart(fig_send, use_container_width=True)
-
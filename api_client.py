@@ -0,0 +1,94 @@
+# Imports
+import os
+import threading
+import time
+import requests
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from tenacity import retry, retry_if_exception_type, retry_if_result, stop_after_attempt, wait_exponential
+
+# Token bucket shared by every thread in the process (and so by every Streamlit session)
+class RateLimiter:
+    def __init__(self, RequestsPerSecond, Burst=1):
+        self.Rate = RequestsPerSecond
+        self.Burst = Burst
+        self._tokens = Burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Reserve one request slot and wait until it is due
+    def Acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.Burst, self._tokens + (now - self._updated) * self.Rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.Rate if self._tokens < 0 else 0
+
+        if wait > 0:
+            time.sleep(wait)
+
+_Etherscan_Limiter = None
+_Limiter_Lock = threading.Lock()
+
+# Process-wide Etherscan limiter, sized to the plan's rate (Etherscan_Requests_Per_Second, default 5)
+def GetEtherscanLimiter():
+    global _Etherscan_Limiter
+    with _Limiter_Lock:
+        if _Etherscan_Limiter is None:
+            _Etherscan_Limiter = RateLimiter(float(os.getenv("Etherscan_Requests_Per_Second", "5")))
+        return _Etherscan_Limiter
+
+# HTTP statuses worth retrying after a backoff
+_Retry_Statuses = {429, 500, 502, 503, 504}
+
+_Sessions = {}
+_Sessions_Lock = threading.Lock()
+
+# Pooled keep-alive session per API, reused across calls, threads and sessions (pool size from HTTP_Pool_Size)
+def GetSession(Name):
+    with _Sessions_Lock:
+        if Name not in _Sessions:
+            pool_size = int(os.getenv("HTTP_Pool_Size", "16"))
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _Sessions[Name] = session
+        return _Sessions[Name]
+
+# True for responses that should be retried: throttling, server errors and Etherscan's rate-limit payload
+def _ShouldRetry(response):
+    if response.status_code in _Retry_Statuses:
+        return True
+    return len(response.content) < 512 and b"rate limit" in response.content.lower()
+
+# GET with a timeout (HTTP_Timeout, default 30 s) and exponential-backoff retries (HTTP_Retries, default 4).
+# Once retries run out the last response is returned so callers can inspect its status as before.
+def _Get(Name, url, Limiter=None, **kwargs):
+    @retry(
+        stop=stop_after_attempt(int(os.getenv("HTTP_Retries", "4"))),
+        wait=wait_exponential(multiplier=0.5, max=8),
+        retry=retry_if_exception_type((requests.ConnectionError, requests.Timeout)) | retry_if_result(_ShouldRetry),
+        retry_error_callback=lambda state: state.outcome.result(),
+    )
+    def attempt():
+        if Limiter is not None:
+            Limiter.Acquire()
+        return GetSession(Name).get(url, timeout=float(os.getenv("HTTP_Timeout", "30")), **kwargs)
+
+    return attempt()
+
+# Send a GET request to Etherscan once the shared rate limiter allows it
+def EtherscanGet(url):
+    return _Get("etherscan", url, Limiter=GetEtherscanLimiter())
+
+# Send a GET request to CoinMarketCap
+def CoinMarketCapGet(url, **kwargs):
+    return _Get("coinmarketcap", url, **kwargs)
+
+# Gemini client reused for every classification made with the same key (the SDK is imported on first use)
+@lru_cache(maxsize=None)
+def GetGeminiClient(ApiKey):
+    from google import genai
+    return genai.Client(api_key=ApiKey)
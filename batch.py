@@ -0,0 +1,202 @@
+# Imports
+import argparse
+import multiprocessing
+import os
+import pandas as pd
+import config
+import rollups
+import token_filter
+import tx_store
+import wallet_cache
+import wallet_utils
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+# Report tables written for every wallet, in the order a wallet's part files are written.
+# The metrics part is written last, so its presence marks the wallet as done.
+Report_Kinds = ["netflow", "counterparties", "metrics"]
+
+# Read wallet addresses from a text file: one per line, blank lines and # comments ignored, duplicates dropped
+def ReadAddresses(Path):
+    Addresses = []
+    seen = set()
+    with open(Path) as f:
+        for line in f:
+            address = line.split("#", 1)[0].strip()
+            if address and address.lower() not in seen:
+                seen.add(address.lower())
+                Addresses.append(address)
+    return Addresses
+
+# Path of one wallet's part file for a report table
+def _PartPath(OutDir, Address, Kind, Format):
+    return os.path.join(OutDir, "parts", f"{Address.lower()}.{Kind}.{Format}")
+
+# Write a table atomically (to a temporary file, then renamed), so a crash never leaves a half-written part
+def _WriteTable(Table, Path, Format):
+    tmp = Path + ".tmp"
+    if Format == "parquet":
+        Table.to_parquet(tmp, index=False)
+    else:
+        Table.to_csv(tmp, index=False)
+    os.replace(tmp, Path)
+
+# Read a table written by _WriteTable
+def _ReadTable(Path, Format):
+    return pd.read_parquet(Path) if Format == "parquet" else pd.read_csv(Path)
+
+# Sync a wallet's histories into the local store under the shared Etherscan rate limit, read its balance and
+# classify its tokens (the only step that needs CoinMarketCap, see token_filter.ClassifyTokens).
+# Returns the balance and the token verdicts (None without ERC20), or raises if a history could not be downloaded.
+def FetchWallet(Address, Apikey, ERC20=True):
+    Verdicts = None
+    for action in ["txlist", "tokentx"] if ERC20 else ["txlist"]:
+        history = wallet_utils.SyncWalletHistory(Address, Apikey, action)
+        if history is None:
+            raise wallet_utils.EtherscanError(f"could not download {action} history")
+        if action == "tokentx":
+            tokens = rollups.WalletRollup(Address).Append(wallet_utils.ParseERC20Transactions(history))
+            Verdicts = token_filter.ClassifyTokens(tokens, wallet_utils.GetTokenPrices)
+    return wallet_utils.GetWalletBalance(Address, Apikey), Verdicts
+
+# Snapshot of a wallet built only from its stored history, a known balance and token verdicts, without any
+# network request: the datasets are put in this process's wallet cache under the keys the snapshot reads
+def _StoredSnapshot(Address, Balance, Verdicts, ERC20):
+    cache = wallet_cache.GetWalletCache()
+    key = Address.lower()
+    cache.Put((key, "balance"), Balance)
+    cache.Put((key, "txlist"), wallet_utils.ParseTransactions(
+        tx_store.LoadTransactions(Address, "txlist", 0, tx_store.GetLastBlock(Address, "txlist"))
+    ))
+    if ERC20:
+        cache.Put((key, "tokentx"), wallet_utils.ParseERC20Transactions(
+            tx_store.LoadTransactions(Address, "tokentx", 0, tx_store.GetLastBlock(Address, "tokentx"))
+        ))
+    return wallet_utils.WalletSnapshot(Address, None, Streaming=False, TokenVerdicts=Verdicts)
+
+# Drop a wallet's datasets from this process's wallet cache once its reports are written
+def _ReleaseSnapshot(Address):
+    cache = wallet_cache.GetWalletCache()
+    for action in ["balance", "txlist", "tokentx", "rollup:txlist", "rollup:tokentx"]:
+        cache.Invalidate((Address.lower(), action))
+
+# Compute one wallet's metrics, daily net flows and top counterparties from the local store and write them
+# as part files (runs in a worker process)
+def AnalyzeWallet(Address, Balance, Verdicts, OutDir, Format, TopK, ERC20):
+    Snapshot = _StoredSnapshot(Address, Balance, Verdicts, ERC20)
+
+    flows = [wallet_utils.GetWalletNetFlow(Snapshot)["Transaction Value"].rename("ETH")]
+    counterparties = []
+    for direction in ["Incoming", "Outgoing"]:
+        top = wallet_utils.WalletTopCounterparties(Snapshot, direction, TopK)
+        counterparties.append(top.assign(Asset="ETH", Direction=direction))
+
+    if ERC20:
+        token_flows = wallet_utils.GetWalletERC20NetFlow(Snapshot)
+        flows.extend(token_flows[symbol].rename(symbol) for symbol in token_flows.columns)
+        for symbol in Snapshot.TokenSymbols:
+            for direction in ["Incoming", "Outgoing"]:
+                top = wallet_utils.WalletTopCounterparties(Snapshot, direction, TopK, Token=symbol)
+                counterparties.append(top.assign(Asset=symbol, Direction=direction))
+
+    netflow = pd.concat(
+        [flow.rename_axis("Date").reset_index(name="Net Flow").assign(Asset=flow.name) for flow in flows]
+    )
+    netflow = netflow[netflow["Net Flow"] != 0]
+    netflow.insert(0, "Address", Address.lower())
+
+    counterparties = pd.concat(counterparties, ignore_index=True)
+    counterparties.insert(0, "Address", Address.lower())
+    counterparties["Rank"] = counterparties.groupby(["Asset", "Direction"]).cumcount() + 1
+
+    metrics = pd.DataFrame([{"Address": Address.lower(), **Snapshot.Metrics}])
+
+    tables = {"netflow": netflow, "counterparties": counterparties, "metrics": metrics}
+    for kind in Report_Kinds:
+        _WriteTable(tables[kind], _PartPath(OutDir, Address, kind, Format), Format)
+
+    _ReleaseSnapshot(Address)
+    return Address
+
+# Merge every wallet's part files into one table per report in OutDir
+def CombineReports(OutDir, Format):
+    parts = os.path.join(OutDir, "parts")
+    for kind in Report_Kinds:
+        files = sorted(name for name in os.listdir(parts) if name.endswith(f".{kind}.{Format}"))
+        if not files:
+            continue
+        tables = [_ReadTable(os.path.join(parts, name), Format) for name in files]
+        table = pd.concat([t for t in tables if not t.empty] or tables[:1], ignore_index=True)
+        _WriteTable(table, os.path.join(OutDir, f"{kind}.{Format}"), Format)
+
+# Analyze every address: histories are fetched by FetchWorkers threads (all sharing the process-wide
+# Etherscan rate limiter) and each fetched wallet is handed to a pool of ComputeWorkers processes.
+# Wallets whose metrics part already exists are skipped, so an interrupted run resumes where it stopped.
+def RunBatch(Addresses, Apikey, OutDir, Format="parquet", FetchWorkers=4, ComputeWorkers=None, TopK=10, ERC20=True):
+    os.makedirs(os.path.join(OutDir, "parts"), exist_ok=True)
+    pending = [
+        address for address in Addresses
+        if not os.path.exists(_PartPath(OutDir, address, "metrics", Format))
+    ]
+    print(f"{len(Addresses) - len(pending)} of {len(Addresses)} wallets already done, {len(pending)} to go")
+
+    failed = []
+    done = len(Addresses) - len(pending)
+    fetchers = ThreadPoolExecutor(max_workers=FetchWorkers)
+    # Workers are spawned rather than forked: a fork taken while a fetch thread holds a SQLite connection
+    # leaves the child with a broken copy of that connection's state
+    workers = ProcessPoolExecutor(max_workers=ComputeWorkers, mp_context=multiprocessing.get_context("spawn"))
+    with fetchers, workers:
+        fetches = {fetchers.submit(FetchWallet, address, Apikey, ERC20): address for address in pending}
+        analyses = {}
+
+        for future in as_completed(fetches):
+            address = fetches[future]
+            try:
+                balance, verdicts = future.result()
+            except Exception as e:
+                print(f"{address}: fetch failed: {e}")
+                failed.append(address)
+                continue
+            analyses[workers.submit(AnalyzeWallet, address, balance, verdicts, OutDir, Format, TopK, ERC20)] = address
+
+        for future in as_completed(analyses):
+            address = analyses[future]
+            try:
+                future.result()
+                done += 1
+                print(f"[{done}/{len(Addresses)}] {address}")
+            except Exception as e:
+                print(f"{address}: analysis failed: {e}")
+                failed.append(address)
+
+    CombineReports(OutDir, Format)
+    return failed
+
+# Command-line entry point
+def Main():
+    parser = argparse.ArgumentParser(description="Analyze many Ethereum wallets and write their reports to Parquet or CSV.")
+    parser.add_argument("addresses", help="text file with one wallet address per line")
+    parser.add_argument("--out", default="reports", help="output directory (default: reports)")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet", help="output format (default: parquet)")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="wallets downloaded at the same time (default: 4)")
+    parser.add_argument("--compute-workers", type=int, default=None, help="analysis processes (default: one per CPU)")
+    parser.add_argument("--top", type=int, default=10, help="top counterparties kept per asset and direction (default: 10)")
+    parser.add_argument("--eth-only", action="store_true", help="skip ERC-20 transfers")
+    args = parser.parse_args()
+
+    failed = RunBatch(
+        ReadAddresses(args.addresses),
+        config.Get("Etherscan_API_Key"),
+        args.out,
+        Format=args.format,
+        FetchWorkers=args.fetch_workers,
+        ComputeWorkers=args.compute_workers,
+        TopK=args.top,
+        ERC20=not args.eth_only,
+    )
+    if failed:
+        print(f"{len(failed)} wallets failed; run the same command again to retry them")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,79 @@
+# Imports
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Cold-start benchmark: how long importing each app module takes in a fresh interpreter, and which heavy
+# SDKs that import drags in. Runs without a .env file or API keys, prints a table and can save the timings
+# as JSON or compare them with a saved baseline, like run_bench.py.
+
+Root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_bench import FindRegressions, PrintTable
+
+# Modules timed by default, from the lightest entry point to the full UI
+Modules = ["config", "wallet_cache", "tx_store", "chart_data", "rollups", "wallet_utils", "batch", "Visualizations"]
+
+# SDKs that should only load when they are used
+Heavy_Modules = ["google.genai", "plotly.express", "streamlit", "pandas"]
+
+# Seconds to import Module in a fresh interpreter (best of Repeats runs, started from an empty directory so
+# no .env file is found) and the heavy SDKs it loaded
+def TimeImport(Module, Repeats):
+    code = (
+        "import sys, time, json\n"
+        f"sys.path.insert(0, {Root!r})\n"
+        "start = time.perf_counter()\n"
+        f"import {Module}\n"
+        "seconds = time.perf_counter() - start\n"
+        f"print(json.dumps([seconds, [m for m in {Heavy_Modules!r} if m in sys.modules]]))\n"
+    )
+    env = {name: value for name, value in os.environ.items() if not name.endswith("_API_Key")}
+    best, loaded = None, []
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(Repeats):
+            result = subprocess.run(
+                [sys.executable, "-c", code], cwd=tmp, env=env, capture_output=True, text=True, check=True
+            )
+            seconds, loaded = json.loads(result.stdout.strip().splitlines()[-1])
+            best = seconds if best is None else min(best, seconds)
+    return best, loaded
+
+# Command-line entry point
+def Main():
+    parser = argparse.ArgumentParser(description="Time cold imports of the app's modules.")
+    parser.add_argument("--modules", default=",".join(Modules), help="comma-separated modules to import")
+    parser.add_argument("--repeats", type=int, default=3, help="fresh interpreters per module; the best time is kept (default: 3)")
+    parser.add_argument("--json", help="write the timings to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="slowdown factor that counts as a regression (default: 1.5)")
+    args = parser.parse_args()
+
+    Results = {"import": {}}
+    Loaded = {}
+    for module in args.modules.split(","):
+        Results["import"][module], Loaded[module] = TimeImport(module, args.repeats)
+
+    PrintTable(Results)
+    print()
+    for module, loaded in Loaded.items():
+        print(f"{module:<24}loads {', '.join(loaded) or 'none of ' + ', '.join(Heavy_Modules)}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(Results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = FindRegressions(Results, json.load(f), args.tolerance)
+        for size, stage, before, after in regressions:
+            print(f"REGRESSION import {stage}: {before:.3f}s -> {after:.3f}s")
+        if regressions:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,284 @@
+# Imports
+import argparse
+import json
+import random
+import threading
+import time
+import numpy as np
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+# Local stand-in for the Etherscan and CoinMarketCap endpoints the app uses, serving synthetic wallets.
+# A wallet's address encodes its size: the address whose hex value is N has N normal transactions and
+# N ERC-20 transfers, e.g. WalletAddress(100000) = 0x00000000000000000000000000000000000186a0.
+
+# Synthetic chain: the head block is mined "now" and blocks are 12 seconds apart
+Head_Block = 20_000_000
+Block_Time = 12
+Wallet_Span_Blocks = 2_000_000
+Max_Results = 10000
+
+# Synthetic ERC-20 tokens: (contract, symbol, name, decimals); the last one has no CoinMarketCap quote
+Tokens = [
+    (f"0x{(2 << 156) + i:040x}", f"TK{i}", f"Token {i}", 6 if i % 4 == 0 else 18) for i in range(19)
+] + [(f"0x{(2 << 156) + 19:040x}", "SPAM!", "Spam Token", 18)]
+
+# CoinMarketCap ID of each synthetic token
+Token_IDs = [5000 + i for i in range(len(Tokens))]
+
+# Address of the synthetic wallet with N transfers
+def WalletAddress(N):
+    return f"0x{N:040x}"
+
+# Unix time at which a block was mined on the synthetic chain
+def BlockTimestamp(Block, Genesis):
+    return Genesis + Block * Block_Time
+
+# Column arrays for one synthetic wallet history ("txlist" or "tokentx"), sorted by block
+def GenerateHistory(N, Action, Genesis):
+    rng = np.random.default_rng(N * 2 + (Action == "tokentx"))
+    address = WalletAddress(N)
+    pool = min(N // 10 + 10, 50000)
+
+    blocks = np.sort(rng.integers(Head_Block - Wallet_Span_Blocks, Head_Block - 10, N))
+    counterparty = np.array([f"0x{(1 << 156) + i:040x}" for i in range(pool)])[rng.integers(0, pool, N)]
+    outgoing = rng.random(N) < 0.5
+    history = {
+        "blockNumber": blocks,
+        "timeStamp": BlockTimestamp(blocks, Genesis) + rng.integers(0, Block_Time, N),
+        "hash": np.array([f"0x{N * 2 + (Action == 'tokentx'):016x}{i:048x}" for i in range(N)]),
+        "from": np.where(outgoing, address, counterparty),
+        "to": np.where(outgoing, counterparty, address),
+        "value": rng.integers(0, 10**7, N) * 10**11,
+        "gasPrice": rng.integers(1, 100, N) * 10**9,
+        "gasUsed": rng.integers(21000, 120000, N),
+    }
+    if Action == "txlist":
+        history["input"] = np.where(rng.random(N) < 0.1, "0xa9059cbb", "0x")
+    else:
+        history["token"] = rng.integers(0, len(Tokens), N)
+    return history
+
+# Etherscan-style JSON rows for the given positions of a history
+def _Rows(History, Action, Positions):
+    rows = []
+    for i in Positions:
+        row = {
+            "blockNumber": str(History["blockNumber"][i]),
+            "timeStamp": str(History["timeStamp"][i]),
+            "hash": History["hash"][i],
+            "from": History["from"][i],
+            "to": History["to"][i],
+            "value": str(History["value"][i]),
+            "gasPrice": str(History["gasPrice"][i]),
+            "gasUsed": str(History["gasUsed"][i]),
+            "isError": "0",
+        }
+        if Action == "txlist":
+            row["input"] = History["input"][i]
+        else:
+            contract, symbol, name, decimals = Tokens[History["token"][i]]
+            row.update({
+                "input": "deprecated",
+                "contractAddress": contract,
+                "tokenSymbol": symbol,
+                "tokenName": name,
+                "tokenDecimal": str(decimals),
+            })
+        rows.append(row)
+    return rows
+
+# Token bucket used to answer like Etherscan once clients exceed the simulated plan rate
+class _RateLimit:
+    def __init__(self, RequestsPerSecond):
+        self.Rate = RequestsPerSecond
+        self._tokens = RequestsPerSecond
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # True if a request may be served now
+    def Allow(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.Rate, self._tokens + (now - self._updated) * self.Rate)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+# Mock API server state: generated wallet histories, simulated faults and request counters
+class MockApi:
+    def __init__(self, RateLimit=None, ErrorRate=0.0, Latency=0.0, Seed=0):
+        self.Genesis = int(time.time()) - Head_Block * Block_Time
+        self.RateLimit = _RateLimit(RateLimit) if RateLimit else None
+        self.ErrorRate = ErrorRate
+        self.Latency = Latency
+        self.Requests = 0
+        self.Throttled = 0
+        self.Errors = 0
+        self._random = random.Random(Seed)
+        self._histories = {}
+        self._lock = threading.Lock()
+
+    # Wallet history for an address, generated on first use (empty for addresses of unknown size)
+    def History(self, Address, Action):
+        N = int(Address, 16) if Address.startswith("0x") and len(Address) == 42 else 0
+        if N > 10_000_000:
+            N = 0
+        key = (N, Action)
+        with self._lock:
+            if key not in self._histories:
+                self._histories[key] = GenerateHistory(N, Action, self.Genesis)
+            return self._histories[key]
+
+    # Answer one Etherscan request: (HTTP status, JSON body)
+    def Etherscan(self, Query):
+        action = Query.get("action")
+
+        if action in ("txlist", "tokentx"):
+            history = self.History(Query.get("address", "").lower(), action)
+            page, offset = int(Query.get("page", 1)), int(Query.get("offset", Max_Results))
+            if page * offset > Max_Results:
+                return 200, {"status": "0", "message": "NOTOK", "result": "Result window is too large, PageNo x Offset size must be less than or equal to 10000"}
+            blocks = history["blockNumber"]
+            start = np.searchsorted(blocks, int(Query.get("startblock", 0)), side="left")
+            end = np.searchsorted(blocks, int(Query.get("endblock", 99999999)), side="right")
+            positions = range(start, end) if Query.get("sort", "asc") == "asc" else range(end - 1, start - 1, -1)
+            positions = positions[(page - 1) * offset:page * offset]
+            if not len(positions):
+                return 200, {"status": "0", "message": "No transactions found", "result": []}
+            return 200, {"status": "1", "message": "OK", "result": _Rows(history, action, positions)}
+
+        if action == "balance":
+            return 200, {"status": "1", "message": "OK", "result": str(int(Query.get("address", "0x0"), 16) * 10**15)}
+        if action == "tokenbalance":
+            return 200, {"status": "1", "message": "OK", "result": str(10**24)}
+        if action == "ethprice":
+            return 200, {"status": "1", "message": "OK", "result": {"ethusd": "3000.00", "ethusd_timestamp": str(int(time.time()))}}
+        if action == "eth_blockNumber":
+            return 200, {"jsonrpc": "2.0", "id": 83, "result": hex(Head_Block)}
+        if action == "getblocknobytime":
+            elapsed = int(Query["timestamp"]) - self.Genesis
+            block = elapsed // Block_Time if Query.get("closest") == "before" else -(-elapsed // Block_Time)
+            if block > Head_Block:
+                return 200, {"status": "0", "message": "NOTOK", "result": "Error! No closest block found"}
+            return 200, {"status": "1", "message": "OK", "result": str(max(block, 0))}
+        return 200, {"status": "0", "message": "NOTOK", "result": "Error! Missing Or invalid Action name"}
+
+    # Answer one CoinMarketCap quotes request, by symbol or by CoinMarketCap ID: (HTTP status, JSON body)
+    def CoinMarketCap(self, Query):
+        listed = [(Token_IDs[i], symbol, (i + 1) * 0.5) for i, (_, symbol, _, _) in enumerate(Tokens) if symbol.isalnum()]
+        listed.append((1027, "ETH", 3000.0))
+        by_symbol = {symbol: (cmc_id, price) for cmc_id, symbol, price in listed}
+        by_id = {str(cmc_id): (symbol, price) for cmc_id, symbol, price in listed}
+        data = {}
+        for symbol in filter(None, Query.get("symbol", "").split(",")):
+            if symbol in by_symbol:
+                data[symbol] = {"id": by_symbol[symbol][0], "symbol": symbol, "quote": {"USD": {"price": by_symbol[symbol][1]}}}
+        for cmc_id in filter(None, Query.get("id", "").split(",")):
+            if cmc_id in by_id:
+                data[cmc_id] = {"id": int(cmc_id), "symbol": by_id[cmc_id][0], "quote": {"USD": {"price": by_id[cmc_id][1]}}}
+        return 200, {"status": {"error_code": 0}, "data": data}
+
+    # Answer one CoinMarketCap historical quotes request with a synthetic daily price series per ID
+    def CoinMarketCapHistory(self, Query):
+        day = 86400
+        start = int(datetime.fromisoformat(Query["time_start"].replace("Z", "+00:00")).timestamp()) // day
+        end = int(datetime.fromisoformat(Query["time_end"].replace("Z", "+00:00")).timestamp()) // day
+        data = {}
+        for cmc_id in filter(None, str(Query.get("id", "")).split(",")):
+            base = 3000.0 if cmc_id == "1027" else (int(cmc_id) - 4999) * 0.5
+            data[cmc_id] = {"id": int(cmc_id), "quotes": [
+                {"timestamp": datetime.fromtimestamp(d * day, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                 "quote": {"USD": {"price": base * (1 + 0.2 * np.sin(d / 30))}}}
+                for d in range(start, end + 1)
+            ]}
+        return 200, {"status": {"error_code": 0}, "data": data}
+
+    # Answer one page of CoinMarketCap's ID map: every listed synthetic token with its Ethereum contract
+    def CoinMarketCapMap(self, Query):
+        coins = [
+            {"id": Token_IDs[i], "symbol": symbol, "name": name,
+             "platform": {"id": 1027, "slug": "ethereum", "token_address": contract}}
+            for i, (contract, symbol, name, _) in enumerate(Tokens) if symbol.isalnum()
+        ]
+        start, limit = int(Query.get("start", 1)), int(Query.get("limit", 5000))
+        return 200, {"status": {"error_code": 0}, "data": coins[start - 1:start - 1 + limit]}
+
+    # Route a request path and query, applying simulated latency, throttling and server errors
+    def Handle(self, Path, Query):
+        with self._lock:
+            self.Requests += 1
+        if self.Latency:
+            time.sleep(self.Latency)
+        if self.ErrorRate and self._random.random() < self.ErrorRate:
+            with self._lock:
+                self.Errors += 1
+            return 502, {"message": "Bad Gateway"}
+
+        if Path.startswith("/v1/cryptocurrency/quotes/latest"):
+            return self.CoinMarketCap(Query)
+        if Path.startswith("/v2/cryptocurrency/quotes/historical"):
+            return self.CoinMarketCapHistory(Query)
+        if Path.startswith("/v1/cryptocurrency/map"):
+            return self.CoinMarketCapMap(Query)
+        if self.RateLimit is not None and not self.RateLimit.Allow():
+            with self._lock:
+                self.Throttled += 1
+            return 200, {"status": "0", "message": "NOTOK", "result": "Max rate limit reached"}
+        return self.Etherscan(Query)
+
+# HTTP handler that hands every GET to the server's MockApi
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        status, body = self.server.Api.Handle(url.path, dict(parse_qsl(url.query)))
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+# Start the mock server on a background thread (Port 0 picks a free port).
+# Returns the server; its URLs are Etherscan_API_URL = http://host:port/api and CoinMarketCap_API_URL = http://host:port
+def StartMockServer(Host="127.0.0.1", Port=0, **Options):
+    server = ThreadingHTTPServer((Host, Port), _Handler)
+    server.daemon_threads = True
+    server.Api = MockApi(**Options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# Base URL of a running mock server
+def ServerURL(Server):
+    host, port = Server.server_address[:2]
+    return f"http://{host}:{port}"
+
+# Command-line entry point: serve until interrupted
+def Main():
+    parser = argparse.ArgumentParser(description="Serve synthetic Etherscan and CoinMarketCap responses.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--rate-limit", type=float, default=None, help="Etherscan requests per second before throttling")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 502")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+
+    server = StartMockServer(args.host, args.port, RateLimit=args.rate_limit, ErrorRate=args.error_rate, Latency=args.latency)
+    url = ServerURL(server)
+    print(f"Etherscan_API_URL={url}/api")
+    print(f"CoinMarketCap_API_URL={url}")
+    print(f"Example wallets: {', '.join(WalletAddress(n) for n in (1000, 100000, 1000000))}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,174 @@
+# Imports
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+# End-to-end benchmark of the wallet pipeline against the local mock server (no network or API keys needed).
+# For every synthetic wallet size it times the fetch, parse, aggregate and chart-prep stages of each view,
+# prints a table and can save the timings as JSON or compare them with a saved baseline.
+
+Root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, Root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mock_server
+
+# Point the app at a running mock server and at a throwaway local store, before its modules are imported
+def _Configure(Server, StorePath):
+    url = mock_server.ServerURL(Server)
+    os.environ["Etherscan_API_URL"] = f"{url}/api"
+    os.environ["CoinMarketCap_API_URL"] = url
+    os.environ["Wallet_Store_Path"] = StorePath
+    os.environ.setdefault("Etherscan_Requests_Per_Second", "1000")
+    os.environ.setdefault("Etherscan_API_Key", "bench")
+    os.environ.setdefault("CoinMarketCap_API_Key", "bench")
+
+# Record how long the body of a with-block takes under Name
+@contextmanager
+def _Stage(Timings, Name):
+    start = time.perf_counter()
+    yield
+    Timings[Name] = time.perf_counter() - start
+
+# Time every stage for one synthetic wallet with N transfers
+def BenchWallet(N):
+    import chart_data
+    import rollups
+    import wallet_cache
+    import wallet_utils
+
+    Address = mock_server.WalletAddress(N)
+    Apikey = os.environ["Etherscan_API_Key"]
+    Timings = {}
+
+    with _Stage(Timings, "fetch txlist (cold)"):
+        raw = wallet_utils.SyncWalletHistory(Address, Apikey, "txlist")
+    with _Stage(Timings, "fetch tokentx (cold)"):
+        raw_tokens = wallet_utils.SyncWalletHistory(Address, Apikey, "tokentx")
+    with _Stage(Timings, "fetch txlist (warm)"):
+        wallet_utils.SyncWalletHistory(Address, Apikey, "txlist")
+
+    with _Stage(Timings, "parse txlist"):
+        transactions = wallet_utils.ParseTransactions(raw)
+    with _Stage(Timings, "parse tokentx"):
+        tokens = wallet_utils.ParseERC20Transactions(raw_tokens)
+
+    with _Stage(Timings, "aggregate txlist"):
+        rollup = rollups.WalletRollup(Address).Append(transactions)
+    with _Stage(Timings, "aggregate tokentx"):
+        token_rollup = rollups.WalletRollup(Address).Append(tokens)
+
+    with _Stage(Timings, "aggregate streaming"):
+        wallet_cache.GetWalletCache().Invalidate((Address.lower(), "rollup:txlist"))
+        wallet_utils.StreamWalletRollup(Address, Apikey, "txlist")
+
+    with _Stage(Timings, "aggregate progressive"):
+        wallet_cache.GetWalletCache().Invalidate((Address.lower(), "rollup:txlist"))
+        for _ in wallet_utils.IterWalletRollup(Address, Apikey, "txlist", CounterpartyDays=True, Parallel=True):
+            pass
+
+    # Views read a snapshot whose datasets are already in the wallet cache, as after the first page load
+    cache = wallet_cache.GetWalletCache()
+    cache.Put((Address.lower(), "txlist"), transactions)
+    cache.Put((Address.lower(), "tokentx"), tokens)
+    cache.Put((Address.lower(), "rollup:txlist"), rollup)
+    cache.Put((Address.lower(), "rollup:tokentx"), token_rollup)
+    Snapshot = wallet_utils.WalletSnapshot(Address, Apikey, Streaming=False)
+    Snapshot.Metrics
+
+    with _Stage(Timings, "view ETH"):
+        chart_data.Downsample(chart_data.DailyChartData(Snapshot.Rollup), chart_data.GetPointBudget())
+        wallet_utils.GetWalletNetFlow(Snapshot)
+        wallet_utils.WalletTopCounterparties(Snapshot, "Incoming")
+        wallet_utils.WalletTopCounterparties(Snapshot, "Outgoing")
+
+    with _Stage(Timings, "view USD"):
+        wallet_utils.ToUSD(chart_data.Downsample(chart_data.DailyChartData(Snapshot.Rollup), chart_data.GetPointBudget()), "ETH")
+        wallet_utils.ToUSD(wallet_utils.GetWalletNetFlow(Snapshot), "ETH")
+        wallet_utils.WalletTopCounterparties(Snapshot, "Incoming", USD=True)
+        wallet_utils.WalletTopCounterparties(Snapshot, "Outgoing", USD=True)
+
+    with _Stage(Timings, "token filter"):
+        Snapshot.TokenVerdicts
+
+    with _Stage(Timings, "view ERC-20"):
+        balances = Snapshot.ERC20Balances
+        net_flow = wallet_utils.GetWalletERC20NetFlow(Snapshot)
+        for symbol in Snapshot.TokenSymbols:
+            assets = Snapshot.TokenAssets(symbol)
+            chart_data.Downsample(chart_data.DailyChartData(Snapshot.ERC20Rollup, assets), chart_data.GetPointBudget())
+            net_flow[[symbol]]
+            wallet_utils.WalletTopCounterparties(Snapshot, "Incoming", Token=symbol)
+            wallet_utils.WalletTopCounterparties(Snapshot, "Outgoing", Token=symbol)
+
+    with _Stage(Timings, "view ERC-20 USD"):
+        held = balances[balances["Raw Balance"] != 0]
+        prices = wallet_utils.GetTokenPrices(held["Contract Address"])
+        for contract in [contract for contract, price in prices.items() if price is not None]:
+            data = chart_data.Downsample(chart_data.DailyChartData(Snapshot.ERC20Rollup, [contract]), chart_data.GetPointBudget())
+            wallet_utils.ToUSD(wallet_utils.ToUSD(data, contract, ["Transaction Value"]), "ETH", ["Transaction Fee"])
+
+    return Timings
+
+# Print timings as one column per wallet size
+def PrintTable(Results):
+    sizes = list(Results)
+    stages = list(next(iter(Results.values())))
+    print(f"{'stage':<24}" + "".join(f"{size:>14}" for size in sizes))
+    for stage in stages:
+        print(f"{stage:<24}" + "".join(f"{Results[size][stage]:>13.3f}s" for size in sizes))
+
+# Stages slower than Tolerance times their baseline (stages under MinSeconds in both runs are ignored as noise)
+def FindRegressions(Results, Baseline, Tolerance, MinSeconds=0.05):
+    regressions = []
+    for size, timings in Results.items():
+        for stage, seconds in timings.items():
+            before = Baseline.get(size, {}).get(stage)
+            if before is not None and seconds > MinSeconds and seconds > before * Tolerance:
+                regressions.append((size, stage, before, seconds))
+    return regressions
+
+# Command-line entry point
+def Main():
+    parser = argparse.ArgumentParser(description="Benchmark the wallet pipeline against the local mock server.")
+    parser.add_argument("--sizes", default="1000,100000", help="comma-separated wallet sizes (default: 1000,100000; add 1000000 for an exchange-scale wallet)")
+    parser.add_argument("--json", help="write the timings to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="slowdown factor that counts as a regression (default: 1.5)")
+    parser.add_argument("--rate-limit", type=float, default=None, help="simulated Etherscan requests per second")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of simulated HTTP 502 responses")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of simulated latency per response")
+    args = parser.parse_args()
+
+    server = mock_server.StartMockServer(RateLimit=args.rate_limit, ErrorRate=args.error_rate, Latency=args.latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        _Configure(server, os.path.join(tmp, "bench_store.db"))
+
+        Results = {}
+        for size in [int(size) for size in args.sizes.split(",")]:
+            Results[str(size)] = BenchWallet(size)
+            print(f"{size} transfers done")
+
+    api = server.Api
+    print(f"mock server: {api.Requests} requests, {api.Throttled} throttled, {api.Errors} errors")
+    server.shutdown()
+    PrintTable(Results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(Results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = FindRegressions(Results, json.load(f), args.tolerance)
+        for size, stage, before, after in regressions:
+            print(f"REGRESSION {size} {stage}: {before:.3f}s -> {after:.3f}s")
+        if regressions:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    Main()
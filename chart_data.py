@@ -0,0 +1,64 @@
+# Imports
+import os
+import numpy as np
+import pandas as pd
+
+# Daily transaction value and fee totals from a wallet rollup, in the layout used by the line charts
+def DailyChartData(Rollup, Assets=None):
+    return (Rollup.DailyTotals(Assets)[["Volume", "Fees"]]
+            .rename(columns={"Volume": "Transaction Value", "Fees": "Transaction Fee"}))
+
+# Most points sent to the browser per line chart trace (Chart_Point_Budget, default 2000)
+def GetPointBudget():
+    return int(os.getenv("Chart_Point_Budget", "2000"))
+
+# Longest zoom window, in days, drawn with one point per transfer instead of daily totals
+# (Raw_Points_Max_Days, default 31)
+def GetRawPointsMaxDays():
+    return int(os.getenv("Raw_Points_Max_Days", "31"))
+
+# Trace mode for a chart with this many points; markers are only drawn on sparse charts
+def GetLineMode(Points):
+    return "lines+markers" if Points <= 500 else "lines"
+
+# Largest-Triangle-Three-Buckets: positions of Threshold points of the line (X, Y) that keep its visual shape.
+# The first and last points are always kept; each bucket in between keeps the point forming the largest
+# triangle with the previously kept point and the average of the next bucket.
+def LTTB(X, Y, Threshold):
+    n = len(X)
+    if Threshold >= n or Threshold < 3:
+        return np.arange(n)
+
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    edges = np.linspace(1, n - 1, Threshold - 1).astype(int)
+    keep = np.empty(Threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+
+    for i in range(Threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = X[end:next_end].mean() if next_end > end else X[-1]
+        next_y = Y[end:next_end].mean() if next_end > end else Y[-1]
+
+        area = np.abs(
+            (X[previous] - next_x) * (Y[start:end] - Y[previous])
+            - (X[previous] - X[start:end]) * (next_y - Y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        keep[i + 1] = previous
+
+    return keep
+
+# Downsample a time-indexed frame to about Threshold points per column with LTTB.
+# Rows picked for any column are kept for all of them, so every trace stays aligned on the same dates.
+def Downsample(Frame, Threshold):
+    if len(Frame) <= Threshold:
+        return Frame
+
+    x = pd.DatetimeIndex(Frame.index).asi8
+    keep = np.unique(np.concatenate([
+        LTTB(x, Frame[column].to_numpy(), Threshold) for column in Frame.columns
+    ]))
+    return Frame.iloc[keep]
@@ -0,0 +1,42 @@
+# Imports
+import os
+import threading
+
+# App configuration. Every setting is an environment variable (see the README for the list); a .env file
+# in the working directory or one of its parents is loaded on first use if there is one, but none is
+# required. Batch jobs and tests can pass their settings explicitly with Configure instead.
+
+_Loaded = False
+_Load_Lock = threading.Lock()
+
+# Load the nearest .env file into the environment once per process; variables already set win over it
+def Load():
+    global _Loaded
+    with _Load_Lock:
+        if _Loaded:
+            return
+        _Loaded = True
+        try:
+            from dotenv import find_dotenv, load_dotenv
+        except ImportError:
+            return
+        path = find_dotenv(usecwd=True)
+        if path:
+            load_dotenv(path)
+
+# Apply explicit settings (a dict and/or keyword arguments of setting name -> value) over the environment
+# and any .env file; a value of None clears the setting. Settings that modules read once at import time
+# (Price_Cache_TTL, Token_Listing_Recheck) must be configured before those modules are imported, and
+# Price_History_Retry, read once by the first daily price download, before any price history is requested.
+def Configure(Settings=None, **More):
+    Load()
+    for name, value in {**(Settings or {}), **More}.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = str(value)
+
+# Value of a setting, or Default when it is not set
+def Get(Name, Default=None):
+    Load()
+    return os.getenv(Name, Default)
@@ -0,0 +1,119 @@
+# Imports
+import os
+import threading
+import numpy as np
+import pandas as pd
+import tx_store
+from cachetools import TTLCache
+from datetime import datetime, timedelta, timezone
+
+# Daily USD price table per asset ("ETH" or an ERC-20 contract address), shared by every wallet.
+# Day ranges are downloaded once and kept in the local store; with Price_History_File set, prices are read
+# from that file instead and nothing is downloaded (offline mode).
+
+# Columns of a price table
+Price_Columns = ["Asset", "Date", "Price"]
+
+_File_Cache = {}
+_File_Lock = threading.Lock()
+
+# Day ranges whose download failed, as (asset, start, end), not retried for Price_History_Retry seconds
+# (default 1 hour) so every USD chart falling back to live prices does not re-send the failing request
+_Failed_Downloads = None
+_Failed_Lock = threading.Lock()
+
+# True when prices come from Price_History_File instead of the network
+def Offline():
+    return bool(os.getenv("Price_History_File"))
+
+# Prices from Price_History_File (CSV, or Parquet if the name ends in .parquet, with Asset, Date and Price
+# columns; Asset is ETH or a token contract address), re-read whenever the file changes
+def _PriceFile():
+    path = os.getenv("Price_History_File")
+    mtime = os.path.getmtime(path)
+    with _File_Lock:
+        if _File_Cache.get("key") != (path, mtime):
+            table = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+            asset = table["Asset"].astype(str).str.lower()
+            _File_Cache["table"] = pd.DataFrame({
+                "Asset": asset.where(asset != "eth", "ETH").to_numpy(dtype=object),
+                "Date": pd.to_datetime(table["Date"]).dt.normalize().to_numpy(dtype="datetime64[ns]"),
+                "Price": table["Price"].astype(float).to_numpy(),
+            })
+            _File_Cache["key"] = (path, mtime)
+        return _File_Cache["table"]
+
+# Days from Start to End (inclusive) not yet downloaded for an asset, as at most two (start, end) ranges
+# on either side of its stored coverage
+def _MissingRanges(Asset, Start, End):
+    coverage = tx_store.GetPriceCoverage(Asset)
+    if coverage is None:
+        return [(Start, End)]
+    covered_start, covered_end = (datetime.fromisoformat(day).date() for day in coverage)
+    ranges = []
+    if Start < covered_start:
+        ranges.append((Start, covered_start - timedelta(days=1)))
+    if End > covered_end:
+        ranges.append((covered_end + timedelta(days=1), End))
+    return ranges
+
+# Failed day ranges; created on first use so Price_History_Retry is read after config.Load(). Call with _Failed_Lock held.
+def _FailedDownloads():
+    global _Failed_Downloads
+    if _Failed_Downloads is None:
+        _Failed_Downloads = TTLCache(maxsize=10000, ttl=float(os.getenv("Price_History_Retry", "3600")))
+    return _Failed_Downloads
+
+# Daily USD prices of each asset from Start to End (inclusive) as a frame of Price_Columns.
+# Days not stored yet are fetched with Download(Asset, Start, End), which returns (ISO date, price) rows,
+# or None when they cannot be downloaded (nothing is stored, and they are retried after Price_History_Retry).
+# Only complete days, up to yesterday in UTC, are downloaded.
+def GetPriceTable(Assets, Start, End, Download):
+    Assets = list(Assets)
+    if Offline():
+        table = _PriceFile()
+        return table[table["Asset"].isin(Assets)]
+
+    yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+    Start, End = pd.Timestamp(Start).date(), min(pd.Timestamp(End).date(), yesterday)
+    frames = []
+
+    for asset in Assets:
+        if Start <= End:
+            for start, end in _MissingRanges(asset, Start, End):
+                with _Failed_Lock:
+                    if (asset, start, end) in _FailedDownloads():
+                        continue
+                rows = Download(asset, start, end)
+                if rows is not None:
+                    tx_store.StoreDailyPrices(asset, rows, start.isoformat(), end.isoformat())
+                else:
+                    with _Failed_Lock:
+                        _FailedDownloads()[(asset, start, end)] = True
+        rows = tx_store.LoadDailyPrices(asset, Start.isoformat(), End.isoformat())
+        if rows:
+            frames.append(pd.DataFrame(rows, columns=["Date", "Price"]).assign(Asset=asset))
+
+    if not frames:
+        return pd.DataFrame(columns=Price_Columns).astype({"Asset": object, "Date": "datetime64[ns]", "Price": float})
+    table = pd.concat(frames, ignore_index=True)
+    table["Date"] = pd.to_datetime(table["Date"]).astype("datetime64[ns]")
+    return table[Price_Columns]
+
+# USD price of every (asset, date) pair from a price table, in one as-of join: the asset's latest daily price
+# on or before that date, or its earliest price for dates before the table starts (NaN if it has none)
+def PricesAsOf(Table, Assets, Dates):
+    rows = pd.DataFrame({
+        "Asset": np.asarray(Assets, dtype=object),
+        "Date": pd.DatetimeIndex(Dates).to_numpy(dtype="datetime64[ns]"),
+        "Row": np.arange(len(Dates)),
+    })
+    Prices = np.full(len(rows), np.nan)
+    if rows.empty or Table.empty:
+        return Prices
+
+    table = Table[Price_Columns].sort_values("Date")
+    joined = pd.merge_asof(rows.sort_values("Date"), table, on="Date", by="Asset", direction="backward")
+    earliest = table.groupby("Asset")["Price"].first()
+    Prices[joined["Row"].to_numpy()] = joined["Price"].fillna(joined["Asset"].map(earliest)).to_numpy(dtype=float)
+    return Prices
@@ -0,0 +1,323 @@
+# Imports
+import threading
+import numpy as np
+import pandas as pd
+import wallet_cache
+
+# Daily totals per asset and day
+Daily_Columns = ["Inflow", "Outflow", "Volume", "Fees", "Tx Count"]
+
+# Per-counterparty totals per asset and day
+Counterparty_Columns = ["Inflow", "Outflow"]
+
+# Token details kept per asset
+Asset_Columns = ["Token Symbol", "Token Name", "Token Decimal"]
+
+# Exact wei totals of a transaction frame's Value Hi/Value Lo limbs, optionally grouped by a key, as Python ints.
+# Both limbs are summed as 32-bit quarters so no int64 partial sum can overflow.
+def SumWei(df, by=None):
+    hi = df['Value Hi'].to_numpy(dtype=np.int64)
+    lo = df['Value Lo'].to_numpy(dtype=np.uint64)
+    limbs = pd.DataFrame({
+        'q3': hi >> 32,
+        'q2': hi & 0xFFFFFFFF,
+        'q1': (lo >> np.uint64(32)).astype(np.int64),
+        'q0': (lo & np.uint64(0xFFFFFFFF)).astype(np.int64),
+    }, index=df.index)
+
+    if by is None:
+        totals = limbs.sum()
+        return (int(totals['q3']) << 96) + (int(totals['q2']) << 64) + (int(totals['q1']) << 32) + int(totals['q0'])
+
+    totals = limbs.groupby(by, observed=True, sort=False).sum()
+    return pd.Series(
+        [(int(q3) << 96) + (int(q2) << 64) + (int(q1) << 32) + int(q0)
+         for q3, q2, q1, q0 in zip(totals['q3'], totals['q2'], totals['q1'], totals['q0'])],
+        index=totals.index,
+        dtype=object,
+    )
+
+# Daily rollup of a wallet's transfers, built once per dataset and shared by every chart and metric.
+# Daily is indexed by (Asset, Date) and Counterparties by (Asset, Date, Counterparty), where Asset is
+# "ETH" for normal transactions and the token contract address for ERC-20 transfers. Holdings is the
+# exact net amount received per asset in base units (wei), as Python ints.
+# With CounterpartyDays=False counterparty totals are kept for the whole history (Date is NaT), so
+# their size is bounded by the number of distinct counterparties instead of counterparty-days.
+class WalletRollup:
+    def __init__(self, Address, Daily=None, Counterparties=None, Assets=None, Holdings=None,
+                 LastBlock=-1, CounterpartyDays=True):
+        self.Address = Address.lower()
+        self.Daily = Daily if Daily is not None else _EmptyFrame(["Asset", "Date"], Daily_Columns)
+        self.Counterparties = (
+            Counterparties if Counterparties is not None
+            else _EmptyFrame(["Asset", "Date", "Counterparty"], Counterparty_Columns)
+        )
+        self.Assets = Assets if Assets is not None else pd.DataFrame(columns=Asset_Columns)
+        self.Holdings = Holdings if Holdings is not None else pd.Series(dtype=object)
+        self.LastBlock = LastBlock
+        self.CounterpartyDays = CounterpartyDays
+        self._AllTimeCounterparties = None
+
+    # Return a new rollup that also covers the rows of Transactions past LastBlock
+    def Append(self, Transactions):
+        return RollupBuilder(self).Append(Transactions).Rollup()
+
+    # Daily totals for the given assets (all assets if None), summed across them and indexed by Date
+    def DailyTotals(self, Assets=None):
+        daily = self.Daily
+        if Assets is not None:
+            daily = daily[daily.index.get_level_values("Asset").isin(list(Assets))]
+        return daily.groupby(level="Date").sum()
+
+    # Per-counterparty Inflow/Outflow totals for the given assets (all if None), optionally limited to
+    # days between Start and End (inclusive). All-time totals per asset are computed once and reused.
+    # With Prices, a function giving the price of each (asset, date) row as an array, every day's amounts
+    # are valued at that day's price before they are summed.
+    def CounterpartyTotals(self, Assets=None, Start=None, End=None, Prices=None):
+        if Start is None and End is None and Prices is None:
+            if self._AllTimeCounterparties is None:
+                self._AllTimeCounterparties = self.Counterparties.groupby(level=["Asset", "Counterparty"]).sum()
+            counterparties = self._AllTimeCounterparties
+        else:
+            counterparties = self.Counterparties
+            if Start is not None or End is not None:
+                if not self.CounterpartyDays:
+                    raise ValueError("Counterparty date filters need a rollup built with CounterpartyDays=True")
+                dates = counterparties.index.get_level_values("Date")
+                keep = np.ones(len(counterparties), dtype=bool)
+                if Start is not None:
+                    keep &= dates >= pd.Timestamp(Start)
+                if End is not None:
+                    keep &= dates <= pd.Timestamp(End)
+                counterparties = counterparties[keep]
+            if Prices is not None:
+                if Assets is not None:
+                    counterparties = counterparties[counterparties.index.get_level_values("Asset").isin(list(Assets))]
+                counterparties = counterparties.mul(Prices(
+                    counterparties.index.get_level_values("Asset"), counterparties.index.get_level_values("Date")
+                ), axis=0)
+            counterparties = counterparties.droplevel("Date")
+
+        if Assets is not None:
+            counterparties = counterparties[counterparties.index.get_level_values("Asset").isin(list(Assets))]
+        return counterparties.groupby(level="Counterparty").sum()
+
+    # Top K counterparties by Direction ("Inflow" or "Outflow") via partial selection, with both totals
+    # of every returned counterparty, largest first (valued with Prices, as in CounterpartyTotals)
+    def TopCounterparties(self, Direction, K=10, Assets=None, Start=None, End=None, Prices=None):
+        totals = self.CounterpartyTotals(Assets, Start, End, Prices)
+        values = totals[Direction].to_numpy()
+        candidates = np.flatnonzero(values > 0)
+
+        if len(candidates) > K:
+            candidates = candidates[np.argpartition(-values[candidates], K - 1)[:K]]
+        candidates = candidates[np.argsort(-values[candidates], kind="stable")]
+
+        return totals.iloc[candidates]
+
+    # Asset keys whose token symbol is Symbol
+    def AssetsForSymbol(self, Symbol):
+        return self.Assets.index[self.Assets["Token Symbol"] == Symbol]
+
+    # Memory used by the rollup tables, for the wallet cache's budget
+    def __sizeof__(self):
+        return int(
+            self.Daily.memory_usage(index=True, deep=True).sum()
+            + self.Counterparties.memory_usage(index=True, deep=True).sum()
+            + self.Assets.memory_usage(index=True, deep=True).sum()
+            + self.Holdings.memory_usage(index=True, deep=True)
+        )
+
+# Empty totals frame with the given index levels and columns
+def _EmptyFrame(Levels, Columns):
+    index = pd.MultiIndex.from_arrays([[] for _ in Levels], names=Levels)
+    return pd.DataFrame({column: pd.Series(dtype="float64") for column in Columns}, index=index)
+
+# Add totals frames that share the same index levels, in one concat and group-by
+def _Combine(Existing, *New):
+    frames = [frame for frame in (Existing, *New) if not frame.empty]
+    if len(frames) <= 1:
+        return frames[0] if frames else Existing
+    return (pd.concat(frames)
+            .groupby(level=list(range(Existing.index.nlevels)), dropna=False)
+            .sum())
+
+# Extends a rollup with many batches of transactions, such as the pages of a download.
+# Batches are buffered until they hold BatchRows transfers (the size of a stored-history chunk) and then
+# reduced to partial tables together. Partials are only merged into the running totals once they hold at
+# least as many rows as the totals, so every row is regrouped a few times in all rather than once per
+# batch, and memory stays bounded by the buffer and the size of the totals.
+# DailyTotals gives per-day totals across assets after every batch, for progress previews; it can be read
+# from other threads (sessions sharing the download) while batches are added.
+class RollupBuilder:
+    def __init__(self, Rollup, BatchRows=50000):
+        self.Address = Rollup.Address
+        self.LastBlock = Rollup.LastBlock
+        self.BatchRows = BatchRows
+        self._Rollup = Rollup
+        self._Buffer = []
+        self._Buffer_Rows = 0
+        self._Pending = []
+        self._Pending_Rows = 0
+        self._Assets = Rollup.Assets
+        self._Days = None
+        self._Lock = threading.Lock()
+
+    # Add the rows of Transactions past LastBlock; returns the builder
+    def Append(self, Transactions):
+        if Transactions is None or Transactions.empty:
+            return self
+        with self._Lock:
+            self._Add(Transactions[Transactions["Block Number"] > self.LastBlock])
+        return self
+
+    # Buffer a batch of new blocks and fold it in once enough rows are waiting (called with the lock held)
+    def _Add(self, new):
+        if new.empty:
+            return
+
+        self._Buffer.append(new)
+        self._Buffer_Rows += len(new)
+        self.LastBlock = int(new["Block Number"].max())
+        if self._Days is not None:
+            self._Days = _Combine(self._Days, _DailyRows(self.Address, new).groupby("Date").sum())
+        if "Contract Address" in new:
+            contracts = new["Contract Address"].astype(str)
+            unseen = ~contracts.isin(self._Assets.index).to_numpy()
+            if unseen.any():
+                assets = new.loc[unseen, Asset_Columns].set_axis(contracts[unseen].to_numpy()).groupby(level=0).first()
+                self._Assets = pd.concat([self._Assets, assets])
+        elif self._Assets.empty:
+            self._Assets = _ETH_Asset.copy()
+
+        if self._Buffer_Rows >= self.BatchRows:
+            self._Reduce()
+        if self._Pending_Rows >= len(self._Rollup.Daily) + len(self._Rollup.Counterparties):
+            self._Merge()
+
+    # Token details of every asset seen so far
+    @property
+    def Assets(self):
+        return self._Assets
+
+    # Daily totals seen so far, summed across assets and indexed by Date
+    def DailyTotals(self):
+        with self._Lock:
+            if self._Days is None:
+                self._Days = _Combine(
+                    self._Rollup.DailyTotals(),
+                    *(daily.groupby(level="Date").sum() for daily, _, _ in self._Pending),
+                    *(_DailyRows(self.Address, batch).groupby("Date").sum() for batch in self._Buffer),
+                )
+            return self._Days
+
+    # Reduce the buffered batches to one set of partial tables
+    def _Reduce(self):
+        if not self._Buffer:
+            return
+        batch = pd.concat(self._Buffer, ignore_index=True) if len(self._Buffer) > 1 else self._Buffer[0]
+        daily, counterparties, holdings = _RollupFrame(self.Address, batch, self._Rollup.CounterpartyDays)
+        self._Pending.append((daily, counterparties, holdings))
+        self._Pending_Rows += len(daily) + len(counterparties)
+        self._Buffer = []
+        self._Buffer_Rows = 0
+
+    # Merge the pending partials into the running totals
+    def _Merge(self):
+        if not self._Pending:
+            return
+        dailies, counterparties, holdings = zip(*self._Pending)
+        base = self._Rollup
+        total = base.Holdings
+        for batch in holdings:
+            total = total.add(batch, fill_value=0) if not total.empty else batch
+        self._Rollup = WalletRollup(
+            self.Address,
+            Daily=_Combine(base.Daily, *dailies),
+            Counterparties=_Combine(base.Counterparties, *counterparties),
+            Assets=self._Assets,
+            Holdings=total,
+            LastBlock=self.LastBlock,
+            CounterpartyDays=base.CounterpartyDays,
+        )
+        self._Pending = []
+        self._Pending_Rows = 0
+
+    # The rollup covering every batch appended so far
+    def Rollup(self):
+        with self._Lock:
+            self._Reduce()
+            self._Merge()
+            return self._Rollup
+
+# Token details of Ether, the only asset of normal transactions
+_ETH_Asset = pd.DataFrame({"Token Symbol": ["ETH"], "Token Name": ["Ether"], "Token Decimal": [18]}, index=["ETH"])
+
+# Daily columns of every transfer in a batch of parsed transactions, before they are grouped by day
+def _DailyRows(Address, Transactions):
+    df = Transactions
+    value = df["Transaction Value"].to_numpy()
+    return pd.DataFrame({
+        "Date": df["Date"].dt.normalize().to_numpy(),
+        "Inflow": np.where((df["To"] == Address).to_numpy(), value, 0.0),
+        "Outflow": np.where((df["From"] == Address).to_numpy(), value, 0.0),
+        "Volume": value,
+        "Fees": df["Transaction Fee"].to_numpy(),
+        "Tx Count": np.ones(len(df)),
+    })
+
+# Build the daily, counterparty and holdings tables for one batch of parsed transactions
+def _RollupFrame(Address, Transactions, CounterpartyDays=True):
+    df = Transactions
+    if "Contract Address" in df:
+        asset = df["Contract Address"].astype(str).to_numpy()
+    else:
+        asset = np.full(len(df), "ETH", dtype=object)
+
+    daily = _DailyRows(Address, df)
+    day = daily["Date"].to_numpy()
+    counterparty_day = day if CounterpartyDays else np.full(len(df), np.datetime64("NaT"), dtype=day.dtype)
+    value = daily["Volume"].to_numpy()
+    outgoing = (df["From"] == Address).to_numpy()
+    incoming = (df["To"] == Address).to_numpy()
+
+    inflow = SumWei(df[incoming], asset[incoming])
+    outflow = SumWei(df[outgoing], asset[outgoing])
+    holdings = inflow.add(-outflow, fill_value=0)
+
+    daily = daily.assign(Asset=asset).groupby(["Asset", "Date"]).sum()[Daily_Columns]
+
+    counterparties = pd.concat([
+        pd.DataFrame({
+            "Asset": asset[outgoing],
+            "Date": counterparty_day[outgoing],
+            "Counterparty": df["To"].to_numpy()[outgoing].astype(str),
+            "Inflow": 0.0,
+            "Outflow": value[outgoing],
+        }),
+        pd.DataFrame({
+            "Asset": asset[incoming],
+            "Date": counterparty_day[incoming],
+            "Counterparty": df["From"].to_numpy()[incoming].astype(str),
+            "Inflow": value[incoming],
+            "Outflow": 0.0,
+        }),
+    ]).groupby(["Asset", "Date", "Counterparty"], dropna=False).sum()
+
+    return daily, counterparties, holdings
+
+# Rollup for a wallet dataset, kept in the shared wallet cache and extended with only the new blocks
+# when the dataset has grown since it was last built
+def GetWalletRollup(Address, Action, Transactions):
+    cache = wallet_cache.GetWalletCache()
+    key = (Address.lower(), f"rollup:{Action}")
+    rollup = cache.Peek(key)
+    fresh = rollup is None
+
+    if fresh:
+        rollup = WalletRollup(Address)
+
+    updated = rollup.Append(Transactions)
+    if fresh or updated is not rollup:
+        cache.Put(key, updated)
+    return updated
@@ -0,0 +1,67 @@
+# Imports
+import os
+import re
+import pandas as pd
+import tx_store
+
+# Symbols made of letters, digits and the separators real tokens use (UNI-V2, USDC.e, B-80BAL-20WETH);
+# anything else (emoji, spaces, other punctuation) is a spam marker
+_Valid_Symbol = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._+-]*$')
+
+# Links airdrop spam puts in token names and symbols to lure holders to a phishing site
+_Spam_Phrases = re.compile(r'https?://|www\.|\b[a-z0-9-]+\.(xyz|top|site|click|link|app|io)\b', re.IGNORECASE)
+
+# Lower-cased contract addresses from a comma-separated setting
+def _ContractList(Name):
+    return {contract.strip().lower() for contract in os.getenv(Name, "").split(",") if contract.strip()}
+
+# True unless Token_Filter is set to 0
+def FilterEnabled():
+    return os.getenv("Token_Filter", "1") != "0"
+
+# True when a token's symbol cannot be a real one or its name or symbol advertises a site
+def _Suspicious(Symbol, Name):
+    return not _Valid_Symbol.match(Symbol) or bool(_Spam_Phrases.search(Symbol) or _Spam_Phrases.search(Name))
+
+# Spam verdict for every token of an ERC-20 rollup, indexed by contract with Token Symbol, Spam and Reason.
+# Contracts in Token_Allowlist / Token_Denylist are always kept / dropped. Any other token the wallet has sent
+# is kept. A token it only ever received is an unsolicited airdrop when it has no market price (prices come
+# from GetPrices, a contract -> price lookup that leaves out contracts it could not check, and are only
+# requested for these inbound-only tokens). When its price could not be checked, it is only dropped if its
+# symbol cannot be real or its name or symbol advertises a site; otherwise it is kept and checked next time.
+# Only the market check is cached, per contract for Token_Verdict_TTL seconds (default 7 days): it is the
+# same for every wallet, while the inbound-only test is made again for each wallet's rollup.
+def ClassifyTokens(Rollup, GetPrices):
+    Assets = Rollup.Assets
+    Verdicts = pd.DataFrame({"Token Symbol": Assets["Token Symbol"], "Spam": False, "Reason": ""}, index=Assets.index)
+    if Assets.empty:
+        return Verdicts
+
+    allow, deny = _ContractList("Token_Allowlist"), _ContractList("Token_Denylist")
+    outflow = Rollup.Daily["Outflow"].groupby(level="Asset").sum()
+    candidates = []
+
+    for contract in Assets.index:
+        if contract in allow:
+            Verdicts.loc[contract, ["Spam", "Reason"]] = (False, "allowlist")
+        elif contract in deny:
+            Verdicts.loc[contract, ["Spam", "Reason"]] = (True, "denylist")
+        elif outflow.get(contract, 0) == 0:
+            candidates.append(contract)
+
+    if candidates:
+        market = tx_store.GetTokenMarket(candidates, float(os.getenv("Token_Verdict_TTL", "604800")))
+        unchecked = [contract for contract in candidates if contract not in market]
+        if unchecked:
+            prices = GetPrices(unchecked)
+            checked = {contract: prices[contract] is not None for contract in unchecked if contract in prices}
+            tx_store.PutTokenMarket(checked)
+            market.update(checked)
+        for contract in candidates:
+            token = Assets.loc[contract]
+            if market.get(contract) is False:
+                Verdicts.loc[contract, ["Spam", "Reason"]] = (True, "unsolicited airdrop")
+            elif market.get(contract) is None and _Suspicious(str(token["Token Symbol"]), str(token["Token Name"])):
+                Verdicts.loc[contract, ["Spam", "Reason"]] = (True, "suspicious name or symbol")
+
+    return Verdicts
@@ -0,0 +1,91 @@
+# Imports
+import os
+import threading
+import time
+import pandas as pd
+import tx_store
+
+# Registry of ERC-20 token metadata keyed by contract address: symbol, name, decimals and CoinMarketCap ID.
+# A contract is added the first time it shows up in a transfer and kept in the local store, so ingestion,
+# balances and pricing all read one copy of its metadata instead of re-reading it from every transfer row.
+
+# Columns of a registry lookup
+Token_Columns = ["Token Symbol", "Token Name", "Token Decimal", "CMC ID"]
+
+# Registry entries already read in this process: contract -> [symbol, name, decimals, cmc_id, cmc_checked]
+_Tokens = {}
+_Tokens_Lock = threading.Lock()
+
+# Seconds before a contract CoinMarketCap did not list is looked up again (Token_Listing_Recheck, default 7 days)
+def GetListingRecheck():
+    return float(os.getenv("Token_Listing_Recheck", "604800"))
+
+# Registry entries for the given contracts, read from the local store the first time this process needs them
+def _Load(Contracts):
+    with _Tokens_Lock:
+        missing = [contract for contract in Contracts if contract not in _Tokens]
+    if missing:
+        loaded = tx_store.LoadTokens(missing)
+        with _Tokens_Lock:
+            for contract, row in loaded.items():
+                _Tokens.setdefault(contract, list(row))
+    with _Tokens_Lock:
+        return {contract: list(_Tokens[contract]) for contract in Contracts if contract in _Tokens}
+
+# Add the contracts of a frame indexed by contract (Token Symbol, Token Name, Token Decimal) that are not
+# registered yet; contracts already in the registry keep their metadata
+def RegisterTokens(Tokens):
+    if Tokens.empty:
+        return
+    known = _Load(list(Tokens.index))
+    new = Tokens[~Tokens.index.isin(list(known))]
+    if new.empty:
+        return
+
+    rows = {
+        contract: (str(token["Token Symbol"]), str(token["Token Name"]), int(token["Token Decimal"]))
+        for contract, token in new.iterrows()
+    }
+    tx_store.SaveTokens(rows)
+    with _Tokens_Lock:
+        for contract, (symbol, name, decimals) in rows.items():
+            _Tokens.setdefault(contract, [symbol, name, decimals, None, None])
+
+# Registry metadata for the given contracts as a frame indexed by contract (Token_Columns);
+# unregistered contracts get empty rows
+def GetTokens(Contracts):
+    Contracts = list(Contracts)
+    entries = _Load(Contracts)
+    rows = [entries.get(contract, [None, None, None, None])[:4] for contract in Contracts]
+    Tokens = pd.DataFrame(rows, columns=Token_Columns, index=pd.Index(Contracts, dtype=object))
+    Tokens["CMC ID"] = Tokens["CMC ID"].where(Tokens["CMC ID"] != 0)
+    return Tokens
+
+# CoinMarketCap ID of every registered contract (None if CoinMarketCap does not list it).
+# Contracts whose ID was never looked up, or that were unlisted more than Token_Listing_Recheck seconds ago,
+# are resolved together against LoadListings(), a contract -> ID map of every listed token (or None when it
+# cannot be downloaded, in which case nothing is recorded and they are retried next time).
+# Contracts whose listing is still unknown after that (never resolved, or not registered) are left out.
+def GetProviderIDs(Contracts, LoadListings):
+    Contracts = list(Contracts)
+    entries = _Load(Contracts)
+    now = time.time()
+    stale = [
+        contract for contract, entry in entries.items()
+        if entry[3] is None or (entry[3] == 0 and now - (entry[4] or 0) > GetListingRecheck())
+    ]
+
+    if stale:
+        listings = LoadListings()
+        if listings is not None:
+            found = {contract: int(listings.get(contract, 0)) for contract in stale}
+            tx_store.SaveProviderIDs(found)
+            with _Tokens_Lock:
+                for contract, cmc_id in found.items():
+                    _Tokens[contract][3:5] = [cmc_id, now]
+                    entries[contract][3] = cmc_id
+
+    return {
+        contract: entries[contract][3] or None
+        for contract in Contracts if contract in entries and entries[contract][3] is not None
+    }
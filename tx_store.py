@@ -0,0 +1,323 @@
+# Imports
+import os
+import sqlite3
+import time
+from contextlib import closing
+import pandas as pd
+
+# Raw Etherscan fields kept for every transaction row
+Raw_Fields = [
+    "blockNumber", "timeStamp", "hash", "from", "to", "value", "gasPrice", "gasUsed",
+    "input", "contractAddress", "tokenName", "tokenSymbol", "tokenDecimal",
+]
+
+# Open the local SQLite store (path can be overridden with Wallet_Store_Path)
+def _Connect():
+    path = os.getenv("Wallet_Store_Path", "wallet_store.db")
+    conn = sqlite3.connect(path, timeout=30)
+    # Write-ahead logging lets readers (other sessions, batch workers) proceed while a sync writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    columns = ", ".join(f'"{field}" TEXT' for field in Raw_Fields if field != "blockNumber")
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS transactions "
+        f"(address TEXT, action TEXT, blockNumber INTEGER, {columns})"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_transactions "
+        "ON transactions (address, action, blockNumber)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sync_state "
+        "(address TEXT, action TEXT, last_block INTEGER, PRIMARY KEY (address, action))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sync_ranges "
+        "(address TEXT, action TEXT, start_block INTEGER, end_block INTEGER)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS block_times "
+        "(timestamp INTEGER, closest TEXT, block INTEGER, PRIMARY KEY (timestamp, closest))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS summaries "
+        "(model TEXT, prompt_version INTEGER, age INTEGER, activity TEXT, volume TEXT, summary TEXT, "
+        "created REAL, PRIMARY KEY (model, prompt_version, age, activity, volume))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS token_market "
+        "(contract TEXT PRIMARY KEY, priced INTEGER, created REAL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS tokens "
+        "(contract TEXT PRIMARY KEY, symbol TEXT, name TEXT, decimals INTEGER, cmc_id INTEGER, cmc_checked REAL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS daily_prices "
+        "(asset TEXT, date TEXT, price REAL, PRIMARY KEY (asset, date))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS price_coverage (asset TEXT PRIMARY KEY, start_date TEXT, end_date TEXT)"
+    )
+    return conn
+
+# Highest block already stored for a wallet and action (-1 if never synced)
+def GetLastBlock(Address, Action):
+    with closing(_Connect()) as conn, conn:
+        row = conn.execute(
+            "SELECT last_block FROM sync_state WHERE address = ? AND action = ?",
+            (Address.lower(), Action),
+        ).fetchone()
+    return row[0] if row else -1
+
+# Raw Etherscan rows as store rows for a wallet and action
+def _StoreRows(Address, Action, Transactions):
+    return [
+        (Address, Action) + tuple(
+            int(tx["blockNumber"]) if field == "blockNumber"
+            else tx["input"][:10] if field == "input" and tx.get("input")
+            else tx.get(field)
+            for field in Raw_Fields
+        )
+        for tx in Transactions
+    ]
+
+# Replace the stored rows in the blocks from StartBlock to EndBlock with Transactions.
+# Fetched pages always hold every row of their blocks, so rows stored earlier by a windowed fetch
+# are overwritten rather than duplicated when a later fetch covers the same blocks.
+def _ReplaceRows(conn, Address, Action, Transactions, StartBlock, EndBlock):
+    placeholders = ", ".join("?" for _ in Raw_Fields)
+    columns = ", ".join(f'"{field}"' for field in Raw_Fields)
+    conn.execute(
+        "DELETE FROM transactions WHERE address = ? AND action = ? AND blockNumber BETWEEN ? AND ?",
+        (Address, Action, StartBlock, EndBlock),
+    )
+    conn.executemany(
+        f"INSERT INTO transactions (address, action, {columns}) VALUES (?, ?, {placeholders})",
+        _StoreRows(Address, Action, Transactions),
+    )
+
+# Append newly fetched raw rows and advance the wallet's last synced block in one transaction
+def AppendTransactions(Address, Action, Transactions, LastBlock):
+    address = Address.lower()
+    first_block = int(Transactions[0]["blockNumber"]) if Transactions else LastBlock
+
+    with closing(_Connect()) as conn, conn:
+        _ReplaceRows(conn, address, Action, Transactions, first_block, LastBlock)
+        conn.execute(
+            "INSERT INTO sync_state (address, action, last_block) VALUES (?, ?, ?) "
+            "ON CONFLICT (address, action) DO UPDATE SET last_block = excluded.last_block",
+            (address, Action, LastBlock),
+        )
+        conn.execute(
+            "DELETE FROM sync_ranges WHERE address = ? AND action = ? AND end_block <= ?",
+            (address, Action, LastBlock),
+        )
+
+# Store every raw row of a wallet between StartBlock and EndBlock (a date window fetched on its own)
+# without touching the contiguous history tracked by sync_state. The block range is recorded,
+# merged with any overlapping or adjacent ranges, so later windows inside it are served locally.
+def StoreWindow(Address, Action, Transactions, StartBlock, EndBlock):
+    address = Address.lower()
+
+    with closing(_Connect()) as conn, conn:
+        _ReplaceRows(conn, address, Action, Transactions, StartBlock, EndBlock)
+        overlapping = conn.execute(
+            "SELECT MIN(start_block), MAX(end_block) FROM sync_ranges "
+            "WHERE address = ? AND action = ? AND start_block <= ? AND end_block >= ?",
+            (address, Action, EndBlock + 1, StartBlock - 1),
+        ).fetchone()
+        conn.execute(
+            "DELETE FROM sync_ranges "
+            "WHERE address = ? AND action = ? AND start_block <= ? AND end_block >= ?",
+            (address, Action, EndBlock + 1, StartBlock - 1),
+        )
+        conn.execute(
+            "INSERT INTO sync_ranges (address, action, start_block, end_block) VALUES (?, ?, ?, ?)",
+            (
+                address, Action,
+                min(StartBlock, overlapping[0]) if overlapping[0] is not None else StartBlock,
+                max(EndBlock, overlapping[1]) if overlapping[1] is not None else EndBlock,
+            ),
+        )
+
+# Stored block range (start, end) of a wallet's windowed fetches that contains Block, or None
+def GetWindowRange(Address, Action, Block):
+    with closing(_Connect()) as conn, conn:
+        return conn.execute(
+            "SELECT start_block, end_block FROM sync_ranges "
+            "WHERE address = ? AND action = ? AND start_block <= ? AND end_block >= ?",
+            (Address.lower(), Action, Block, Block),
+        ).fetchone()
+
+# Load the stored raw rows for a wallet and action, oldest first,
+# optionally limited to the blocks from StartBlock to EndBlock (inclusive)
+def LoadTransactions(Address, Action, StartBlock=0, EndBlock=99999999):
+    columns = ", ".join(f'"{field}"' for field in Raw_Fields)
+    with closing(_Connect()) as conn, conn:
+        return pd.read_sql_query(
+            f"SELECT {columns} FROM transactions WHERE address = ? AND action = ? "
+            f"AND blockNumber BETWEEN ? AND ? ORDER BY blockNumber, rowid",
+            conn,
+            params=(Address.lower(), Action, StartBlock, EndBlock),
+        )
+
+# Unix timestamp of the earliest stored row for a wallet and action, or None if nothing is stored
+def GetFirstTimestamp(Address, Action):
+    with closing(_Connect()) as conn, conn:
+        row = conn.execute(
+            "SELECT timeStamp FROM transactions WHERE address = ? AND action = ? ORDER BY blockNumber LIMIT 1",
+            (Address.lower(), Action),
+        ).fetchone()
+    return int(row[0]) if row else None
+
+# Stream stored raw rows for a wallet and action after AfterBlock (up to UpToBlock) in chunks of about
+# ChunkSize rows. Chunks end on block boundaries, so every block's rows arrive together.
+def IterTransactions(Address, Action, AfterBlock=-1, ChunkSize=50000, UpToBlock=99999999):
+    columns = ", ".join(f'"{field}"' for field in Raw_Fields)
+    query = (
+        f"SELECT {columns} FROM transactions WHERE address = ? AND action = ? "
+        f"AND blockNumber <= {int(UpToBlock)} AND blockNumber {{}} ? ORDER BY blockNumber, rowid {{}}"
+    )
+    address = Address.lower()
+
+    with closing(_Connect()) as conn:
+        while True:
+            chunk = pd.read_sql_query(
+                query.format(">", "LIMIT ?"), conn, params=(address, Action, AfterBlock, ChunkSize)
+            )
+            if len(chunk) < ChunkSize:
+                if not chunk.empty:
+                    yield chunk
+                return
+
+            last_block = int(chunk["blockNumber"].iloc[-1])
+            complete = chunk[chunk["blockNumber"] < last_block]
+            if complete.empty:
+                # A single block holds more rows than one chunk
+                complete = pd.read_sql_query(query.format("=", ""), conn, params=(address, Action, last_block))
+                AfterBlock = last_block
+            else:
+                AfterBlock = last_block - 1
+            yield complete
+
+# Block number cached for a Unix timestamp and direction ("before" or "after"), or None
+def GetCachedBlock(Timestamp, Closest):
+    with closing(_Connect()) as conn, conn:
+        row = conn.execute(
+            "SELECT block FROM block_times WHERE timestamp = ? AND closest = ?", (Timestamp, Closest)
+        ).fetchone()
+    return row[0] if row else None
+
+# Remember the block number found for a Unix timestamp and direction
+def PutCachedBlock(Timestamp, Closest, Block):
+    with closing(_Connect()) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO block_times (timestamp, closest, block) VALUES (?, ?, ?)",
+            (Timestamp, Closest, Block),
+        )
+
+# Wallet summary cached for Key (model, prompt version, age, activity, volume) if younger than MaxAge seconds
+def GetCachedSummary(Key, MaxAge):
+    with closing(_Connect()) as conn, conn:
+        row = conn.execute(
+            "SELECT summary FROM summaries WHERE model = ? AND prompt_version = ? AND age = ? "
+            "AND activity = ? AND volume = ? AND created > ?",
+            Key + (time.time() - MaxAge,),
+        ).fetchone()
+    return row[0] if row else None
+
+# Remember the wallet summary generated for Key
+def PutCachedSummary(Key, Summary):
+    with closing(_Connect()) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO summaries (model, prompt_version, age, activity, volume, summary, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            Key + (Summary, time.time()),
+        )
+
+# Cached market checks (True if the token had a market price) younger than MaxAge seconds for the given
+# token contracts
+def GetTokenMarket(Contracts, MaxAge):
+    Contracts = list(Contracts)
+    market = {}
+    with closing(_Connect()) as conn, conn:
+        for i in range(0, len(Contracts), 500):
+            batch = Contracts[i:i + 500]
+            rows = conn.execute(
+                f"SELECT contract, priced FROM token_market "
+                f"WHERE contract IN ({', '.join('?' for _ in batch)}) AND created > ?",
+                batch + [time.time() - MaxAge],
+            ).fetchall()
+            market.update({contract: bool(priced) for contract, priced in rows})
+    return market
+
+# Remember market checks, a dict of contract -> True if the token had a market price
+def PutTokenMarket(Market):
+    now = time.time()
+    with closing(_Connect()) as conn, conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO token_market (contract, priced, created) VALUES (?, ?, ?)",
+            [(contract, int(priced), now) for contract, priced in Market.items()],
+        )
+
+# Registry rows (symbol, name, decimals, cmc_id, cmc_checked) for the given token contracts
+def LoadTokens(Contracts):
+    Contracts = list(Contracts)
+    tokens = {}
+    with closing(_Connect()) as conn, conn:
+        for i in range(0, len(Contracts), 500):
+            batch = Contracts[i:i + 500]
+            rows = conn.execute(
+                f"SELECT contract, symbol, name, decimals, cmc_id, cmc_checked FROM tokens "
+                f"WHERE contract IN ({', '.join('?' for _ in batch)})",
+                batch,
+            ).fetchall()
+            tokens.update({row[0]: row[1:] for row in rows})
+    return tokens
+
+# Add tokens to the registry, a dict of contract -> (symbol, name, decimals); known contracts are left as they are
+def SaveTokens(Tokens):
+    with closing(_Connect()) as conn, conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO tokens (contract, symbol, name, decimals) VALUES (?, ?, ?, ?)",
+            [(contract,) + tuple(token) for contract, token in Tokens.items()],
+        )
+
+# Record the price-provider IDs looked up for token contracts (0 = not listed)
+def SaveProviderIDs(IDs):
+    now = time.time()
+    with closing(_Connect()) as conn, conn:
+        conn.executemany(
+            "UPDATE tokens SET cmc_id = ?, cmc_checked = ? WHERE contract = ?",
+            [(cmc_id, now, contract) for contract, cmc_id in IDs.items()],
+        )
+
+# Stored daily USD prices of an asset between two ISO dates (inclusive), as (date, price) rows
+def LoadDailyPrices(Asset, Start, End):
+    with closing(_Connect()) as conn:
+        return conn.execute(
+            "SELECT date, price FROM daily_prices WHERE asset = ? AND date BETWEEN ? AND ? ORDER BY date",
+            (Asset, Start, End),
+        ).fetchall()
+
+# ISO dates (start, end) whose daily prices have been downloaded for an asset, or None
+def GetPriceCoverage(Asset):
+    with closing(_Connect()) as conn:
+        return conn.execute(
+            "SELECT start_date, end_date FROM price_coverage WHERE asset = ?", (Asset,)
+        ).fetchone()
+
+# Store downloaded daily prices (date, price) of an asset and widen its coverage to include Start..End,
+# which must touch the existing coverage (days without a quote are covered but have no row)
+def StoreDailyPrices(Asset, Rows, Start, End):
+    with closing(_Connect()) as conn, conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO daily_prices (asset, date, price) VALUES (?, ?, ?)",
+            [(Asset, date, price) for date, price in Rows],
+        )
+        conn.execute(
+            "INSERT INTO price_coverage (asset, start_date, end_date) VALUES (?, ?, ?) "
+            "ON CONFLICT(asset) DO UPDATE SET start_date = min(start_date, excluded.start_date), "
+            "end_date = max(end_date, excluded.end_date)",
+            (Asset, Start, End),
+        )
@@ -0,0 +1,215 @@
+# Imports
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError
+
+# Result of an in-flight load whose caller stopped before it finished (another caller takes it over)
+_Abandoned = object()
+
+# Approximate in-memory size of a cached value in bytes.
+# pandas is not imported here: a value can only be a DataFrame once something else has loaded it.
+def _SizeOf(value):
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    return sys.getsizeof(value)
+
+# Process-wide cache of wallet datasets shared by every Streamlit session.
+# Entries are evicted least-recently-used once the memory budget is exceeded and expire after a TTL,
+# and concurrent requests for the same key wait on a single in-flight load ("single-flight").
+class WalletCache:
+    def __init__(self, MaxBytes, TTL):
+        self.MaxBytes = MaxBytes
+        self.TTL = TTL
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._progress = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+
+    # Return the cached value for Key, or run Loader once (however many callers ask at the same time) and cache it
+    def GetOrLoad(self, Key, Loader):
+        with self._lock:
+            entry = self._entries.get(Key)
+            if entry is not None and time.monotonic() - entry[2] < self.TTL:
+                self._entries.move_to_end(Key)
+                self._hits += 1
+                return entry[0]
+            if entry is not None:
+                self._Remove(Key)
+
+            future = self._inflight.get(Key)
+            if future is not None:
+                self._coalesced += 1
+                owner = False
+            else:
+                self._misses += 1
+                future = Future()
+                self._inflight[Key] = future
+                owner = True
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = Loader()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[Key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[Key]
+            if value is not None:
+                self._Insert(Key, value)
+        future.set_result(value)
+        return value
+
+    # Streaming form of GetOrLoad for values built step by step: Iterate() returns an iterator of progress
+    # values whose last item is the value to cache. The caller that starts the load yields every item;
+    # concurrent callers for the same key share that load instead of starting their own, yielding its
+    # latest progress as it changes and then its value. If the loading caller stops early (e.g. its session
+    # leaves the page), a waiting caller takes the load over. A value already cached within its TTL is
+    # yielded alone.
+    def IterOrLoad(self, Key, Iterate):
+        while True:
+            with self._lock:
+                entry = self._entries.get(Key)
+                if entry is not None and time.monotonic() - entry[2] < self.TTL:
+                    self._entries.move_to_end(Key)
+                    self._hits += 1
+                    value = entry[0]
+                    future = None
+                else:
+                    future = self._inflight.get(Key)
+                    owner = future is None
+                    if owner:
+                        self._misses += 1
+                        future = Future()
+                        self._inflight[Key] = future
+                    else:
+                        self._coalesced += 1
+
+            if future is None:
+                yield value
+                return
+
+            if owner:
+                break
+
+            seen = 0
+            while True:
+                try:
+                    value = future.result(timeout=0.25)
+                    break
+                except TimeoutError:
+                    with self._lock:
+                        step, progress = self._progress.get(Key, (0, None))
+                    if step > seen:
+                        seen = step
+                        yield progress
+            if value is not _Abandoned:
+                yield value
+                return
+
+        value = None
+        try:
+            # Progress is numbered, since an iterator may yield the same (updated) object at every step
+            for step, value in enumerate(Iterate(), 1):
+                with self._lock:
+                    self._progress[Key] = (step, value)
+                yield value
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[Key]
+                self._progress.pop(Key, None)
+            if isinstance(e, GeneratorExit):
+                future.set_result(_Abandoned)
+            else:
+                future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[Key]
+            self._progress.pop(Key, None)
+            if value is not None:
+                self._Insert(Key, value)
+        future.set_result(value)
+
+    # Return the cached value for Key if it is still within its TTL, without loading it (None otherwise)
+    def Get(self, Key):
+        with self._lock:
+            entry = self._entries.get(Key)
+            if entry is None or time.monotonic() - entry[2] >= self.TTL:
+                return None
+            self._entries.move_to_end(Key)
+            return entry[0]
+
+    # Return the cached value for Key without loading it, even if its TTL has passed (None if absent)
+    def Peek(self, Key):
+        with self._lock:
+            entry = self._entries.get(Key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(Key)
+            return entry[0]
+
+    # Store a value built outside GetOrLoad (e.g. an incrementally updated rollup)
+    def Put(self, Key, Value):
+        with self._lock:
+            self._Insert(Key, Value)
+
+    # Drop a cached entry so the next request reloads it
+    def Invalidate(self, Key):
+        with self._lock:
+            if Key in self._entries:
+                self._Remove(Key)
+
+    # Counters for sizing the cache
+    def Stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.MaxBytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "evictions": self._evictions,
+            }
+
+    def _Insert(self, Key, value):
+        if Key in self._entries:
+            self._Remove(Key)
+        size = _SizeOf(value)
+        self._entries[Key] = (value, size, time.monotonic())
+        self._bytes += size
+        while self._bytes > self.MaxBytes and len(self._entries) > 1:
+            self._Remove(next(iter(self._entries)))
+            self._evictions += 1
+
+    def _Remove(self, Key):
+        _, size, _ = self._entries.pop(Key)
+        self._bytes -= size
+
+_Wallet_Cache = None
+_Wallet_Cache_Lock = threading.Lock()
+
+# Shared cache sized by Wallet_Cache_MB (default 512) with entries refreshed after Wallet_Cache_TTL seconds (default 300)
+def GetWalletCache():
+    global _Wallet_Cache
+    with _Wallet_Cache_Lock:
+        if _Wallet_Cache is None:
+            _Wallet_Cache = WalletCache(
+                MaxBytes=int(float(os.getenv("Wallet_Cache_MB", "512")) * 1024 * 1024),
+                TTL=float(os.getenv("Wallet_Cache_TTL", "300")),
+            )
+        return _Wallet_Cache
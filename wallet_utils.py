@@ -1,31 +1,93 @@
 # Imports
-import requests
+import numpy as np
 import pandas as pd
-import re
+import pyarrow as pa
 import os
-import time
-from datetime import datetime
-from google import genai
-from google.genai import types
-from dotenv import load_dotenv, find_dotenv
-
-# Load environment variables from .env file
-dotenv_path = find_dotenv()  
-if dotenv_path:
-    load_dotenv(dotenv_path)
-else:
-    raise FileNotFoundError(".env file not found. Please ensure it's present in the project directory.")
-
-# Retrieve API keys from environment
-Gemini_API_Key = os.getenv("Gemini_API_Key")
-CoinMarketCap_API_Key = os.getenv("CoinMarketCap_API_Key")
-
-# Use Gemini to classify wallet type and generate a reputation summary
+import queue
+import requests
+import threading
+import api_client
+import config
+import price_history
+import rollups
+import token_filter
+import token_registry
+import tx_store
+import wallet_cache
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+# Load settings from the environment and from a .env file, if there is one
+config.Load()
+
+# Etherscan API endpoint; override it to point the app at a local stand-in server (see bench/mock_server.py)
+def GetEtherscanURL():
+    return config.Get("Etherscan_API_URL", "https://api.etherscan.io/api")
+
+# CoinMarketCap API endpoint, overridable like the Etherscan one
+def GetCoinMarketCapURL():
+    return config.Get("CoinMarketCap_API_URL", "https://pro-api.coinmarketcap.com")
+
+# Live price quotes shared by every session, refreshed after Price_Cache_TTL seconds
+_Price_Cache = TTLCache(maxsize=10000, ttl=float(os.getenv("Price_Cache_TTL", "60")))
+_Price_Cache_Lock = threading.Lock()
+_Price_Batch_Size = 100
+
+# Model used for wallet summaries, and the version of the prompt below (bump it whenever the prompt changes
+# so cached summaries written for the old prompt are no longer used)
+Gemini_Model = "gemini-1.5-flash"
+Summary_Prompt_Version = 1
+
+# Cache key for a wallet summary; metrics are rounded the same way the prompt formats them
+def _SummaryKey(age, activity, volume):
+    return (Gemini_Model, Summary_Prompt_Version, int(age), f"{activity:.2f}", f"{volume:.2f}")
+
+# Gemini summary already generated for these metrics (within Summary_Cache_TTL seconds, default 7 days), or None
+def GetCachedWalletSummary(age, activity, volume):
+    return tx_store.GetCachedSummary(
+        _SummaryKey(age, activity, volume), float(os.getenv("Summary_Cache_TTL", "604800"))
+    )
+
+# True when summaries should come from Gemini: a key is configured and Wallet_Classifier is not "local"
+def UseGeminiSummaries():
+    return bool(config.Get("Gemini_API_Key")) and config.Get("Wallet_Classifier", "gemini") != "local"
+
+# Classify a wallet locally with the same HODLer/Trader/Whale thresholds given to Gemini, and a reputation
+# score built from wallet age (up to 40 points over 5 years), activity (30 points) and volume (30 points)
+def classify_wallet_locally(age, activity, volume):
+    if volume > 8000 or activity > 50:
+        label, reason = "Whale", "it moves very large amounts of ETH or transacts at a very high rate"
+    elif 1000 <= volume <= 8000 or 1 <= activity <= 50:
+        label, reason = "Trader", "it transacts regularly and moves a meaningful amount of ETH"
+    else:
+        label, reason = "HODLer", "it transacts less than once a day on average"
+
+    score = round(min(age / 1825, 1) * 40 + min(activity / 50, 1) * 30 + min(volume / 8000, 1) * 30)
+    return f"This wallet looks like a {label}, with a reputation score of {score} out of 100, because {reason}."
+
+# Use Gemini to classify wallet type and generate a reputation summary.
+# The model runs at temperature 0, so answers are cached per model, prompt version and metrics, and
+# concurrent requests for the same metrics (e.g. reruns while an answer is pending) share one Gemini call.
 def classify_wallet_with_gemini(age, activity, volume):
-    if not Gemini_API_Key:
+    api_key = config.Get("Gemini_API_Key")
+    if not api_key:
         raise ValueError("Missing Gemini API Key")
 
-    client = genai.Client(api_key=Gemini_API_Key)
+    cached = GetCachedWalletSummary(age, activity, volume)
+    if cached is not None:
+        return cached
+
+    return wallet_cache.GetWalletCache().GetOrLoad(
+        ("summary",) + _SummaryKey(age, activity, volume),
+        lambda: _GenerateWalletSummary(api_key, age, activity, volume),
+    )
+
+# Ask Gemini for a wallet summary and store it in the summary cache
+def _GenerateWalletSummary(api_key, age, activity, volume):
+    # The Gemini SDK is slow to import, so it is only loaded once a summary is requested
+    from google.genai import types
+    client = api_client.GetGeminiClient(api_key)
 
     prompt = f"""
     You are analyzing an Ethereum wallet using the following metrics:
@@ -58,269 +120,850 @@ def classify_wallet_with_gemini(age, activity, volume):
         )
     ]
 
-    config = types.GenerateContentConfig(
+    generation_config = types.GenerateContentConfig(
         temperature=0,
         max_output_tokens=500,
         response_mime_type="text/plain"
     )
 
     response = client.models.generate_content(
-        model="gemini-1.5-flash",
+        model=Gemini_Model,
         contents=contents,
-        config=config,
+        config=generation_config,
     )
 
-    return response.candidates[0].content.parts[0].text
+    summary = response.candidates[0].content.parts[0].text
+    tx_store.PutCachedSummary(_SummaryKey(age, activity, volume), summary)
+    return summary
 
 # Get the ETH balance of a wallet
 def GetWalletBalance(Address, Apikey):
-    r = requests.get(f"https://api.etherscan.io/api?module=account&action=balance&address={Address}&tag=latest&apikey={Apikey}")
+    r = api_client.EtherscanGet(f"{GetEtherscanURL()}?module=account&action=balance&address={Address}&tag=latest&apikey={Apikey}")
     return float(r.json()["result"])/ 1e18
 
 # Get the current ETH-USD exchange rate
 def GetCurrentUSDETHPrice(Apikey):
-    r = requests.get(f"https://api.etherscan.io/api?module=stats&action=ethprice&apikey={Apikey}")
-    return float(r.json()["result"]["ethusd"])
-
-# Retrieve normal ETH transactions
-def GetWalletTransactions(Address, Apikey):
-    WalletTransactions = []
-    page = 1
-    max_txs = 10000  
-
-    while True:
-        url = (
-            f"https://api.etherscan.io/api?module=account&action=txlist"
-            f"&address={Address}&startblock=0&endblock=99999999"
-            f"&page={page}&offset={max_txs}&sort=asc&apikey={Apikey}"
-        )
-        r = requests.get(url)
-        
-        if r.status_code != 200:
-            print("API request failed:", r.status_code)
-            return None
+    with _Price_Cache_Lock:
+        if ("etherscan", "ETH") in _Price_Cache:
+            return _Price_Cache[("etherscan", "ETH")]
+
+    r = api_client.EtherscanGet(f"{GetEtherscanURL()}?module=stats&action=ethprice&apikey={Apikey}")
+    price = float(r.json()["result"]["ethusd"])
+
+    with _Price_Cache_Lock:
+        _Price_Cache[("etherscan", "ETH")] = price
+    return price
+
+# Raised when Etherscan answers with an error instead of a page of results
+class EtherscanError(Exception):
+    pass
+
+# Get the latest block number on the chain
+def GetLatestBlock(Apikey):
+    r = api_client.EtherscanGet(f"{GetEtherscanURL()}?module=proxy&action=eth_blockNumber&apikey={Apikey}")
+    return int(r.json()["result"], 16)
+
+# Block number closest to a Unix timestamp: the last block mined before it (Closest="before") or the first
+# block mined after it (Closest="after"). Answers for timestamps in the past never change, so they are
+# cached in the local store.
+def GetBlockByTimestamp(Timestamp, Closest, Apikey):
+    Timestamp = int(Timestamp)
+    block = tx_store.GetCachedBlock(Timestamp, Closest)
+    if block is not None:
+        return block
+
+    r = api_client.EtherscanGet(
+        f"{GetEtherscanURL()}?module=block&action=getblocknobytime"
+        f"&timestamp={Timestamp}&closest={Closest}&apikey={Apikey}"
+    )
+    data = r.json()
+    try:
+        block = int(data["result"])
+    except (KeyError, TypeError, ValueError):
+        raise EtherscanError(f"{data.get('message')}: {data.get('result')}")
+
+    if Timestamp < datetime.now(timezone.utc).timestamp() - 3600:
+        tx_store.PutCachedBlock(Timestamp, Closest, block)
+    return block
+
+# Turn a date window (inclusive calendar days in UTC, either end optional) into a block range.
+# Windows that reach today end at the chain head (99999999).
+def GetBlockRange(StartDate, EndDate, Apikey):
+    start_block, end_block = 0, 99999999
+    if StartDate is not None:
+        start = datetime(StartDate.year, StartDate.month, StartDate.day, tzinfo=timezone.utc)
+        start_block = GetBlockByTimestamp(start.timestamp(), "after", Apikey)
+    if EndDate is not None:
+        end = datetime(EndDate.year, EndDate.month, EndDate.day, tzinfo=timezone.utc) + timedelta(days=1)
+        if end.timestamp() < datetime.now(timezone.utc).timestamp():
+            end_block = GetBlockByTimestamp(end.timestamp() - 1, "before", Apikey)
+    return start_block, end_block
+
+# Request one page of a wallet's history starting at block Cursor.
+# Returns the page's complete blocks and the cursor for the next page (None once the range is exhausted):
+# the last block of a full page is dropped and re-requested as the start of the next page,
+# so rows never repeat or go missing at page boundaries.
+def _FetchPage(Address, Apikey, Action, Cursor, EndBlock):
+    max_txs = 10000
+    url = (
+        f"{GetEtherscanURL()}?module=account&action={Action}"
+        f"&address={Address}&startblock={Cursor}&endblock={EndBlock}"
+        f"&page=1&offset={max_txs}&sort=asc&apikey={Apikey}"
+    )
+    r = api_client.EtherscanGet(url)
+
+    if r.status_code != 200:
+        raise EtherscanError(f"API request failed: {r.status_code}")
+
+    data = r.json()
+    transactions = data.get("result", [])
+
+    if not isinstance(transactions, list):
+        raise EtherscanError(f"{data.get('message')}: {transactions}")
+
+    if len(transactions) < max_txs:
+        return transactions, None
+
+    last_block = int(transactions[-1]["blockNumber"])
+    complete = [tx for tx in transactions if int(tx["blockNumber"]) < last_block]
+
+    if complete:
+        return complete, last_block
+
+    # A single block holds more rows than one response can return
+    print(f"Block {last_block} truncated at {max_txs} rows for {Address}")
+    return transactions, last_block + 1
+
+# Stream a wallet's history page by page, advancing startblock past each page instead of using page numbers
+def IterWalletPages(Address, Apikey, Action, StartBlock=0, EndBlock=99999999):
+    cursor = StartBlock
+
+    while cursor is not None and cursor <= EndBlock:
+        transactions, cursor = _FetchPage(Address, Apikey, Action, cursor, EndBlock)
+        if transactions:
+            yield transactions
+
+# Split the blocks from Start to End (inclusive) into at most Parts contiguous ranges
+def _SplitBlockRange(Start, End, Parts):
+    step = max(1, -(-(End - Start + 1) // Parts))
+    return [(a, min(a + step - 1, End)) for a in range(Start, End + 1, step)]
+
+# Stream a wallet's history like IterWalletPages, but once the first page shows the history is larger
+# than one response, split the remaining block span into ranges fetched concurrently
+# (Etherscan_Fetch_Workers, default 4). Pages are still yielded in block order: each range's pages are
+# yielded as soon as they arrive once the ranges before it are done, and later ranges are buffered
+# meanwhile. Closing the generator early stops the remaining downloads after their current page.
+def IterWalletPagesParallel(Address, Apikey, Action, StartBlock=0, EndBlock=99999999):
+    transactions, cursor = _FetchPage(Address, Apikey, Action, StartBlock, EndBlock)
+    if transactions:
+        yield transactions
+    if cursor is None:
+        return
+
+    workers = int(os.getenv("Etherscan_Fetch_Workers", "4"))
+    ranges = _SplitBlockRange(cursor, min(EndBlock, GetLatestBlock(Apikey)), workers)
+    if not ranges:
+        return
+
+    stop = threading.Event()
+
+    # Download one block range into its page queue, ending it with None
+    def FetchRange(Start, End, Pages):
+        try:
+            for page in IterWalletPages(Address, Apikey, Action, Start, End):
+                if stop.is_set():
+                    return
+                Pages.put(page)
+        finally:
+            Pages.put(None)
+
+    pool = ThreadPoolExecutor(max_workers=len(ranges))
+    try:
+        queues = [queue.Queue() for _ in ranges]
+        futures = [pool.submit(FetchRange, start, end, pages) for (start, end), pages in zip(ranges, queues)]
+        for future, pages in zip(futures, queues):
+            for page in iter(pages.get, None):
+                yield page
+            future.result()
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+# Download any blocks newer than the local store for a wallet and return its full stored history.
+# With a block window (StartBlock/EndBlock from GetBlockRange) only that window's rows are returned:
+# if the stored history already reaches the window it is topped up as usual, otherwise just the window is
+# fetched and kept alongside the history (see tx_store.StoreWindow), so a later full sync merges with it.
+def SyncWalletHistory(Address, Apikey, Action, StartBlock=0, EndBlock=99999999):
+    last_block = tx_store.GetLastBlock(Address, Action)
 
-        transactions = r.json().get("result", [])
-        
-        if not transactions:
-            break
+    try:
+        if last_block + 1 >= StartBlock:
+            if last_block < EndBlock:
+                for transactions in IterWalletPagesParallel(Address, Apikey, Action, StartBlock=last_block + 1):
+                    last_block = int(transactions[-1]["blockNumber"])
+                    tx_store.AppendTransactions(Address, Action, transactions, last_block)
+            return tx_store.LoadTransactions(Address, Action, StartBlock, min(EndBlock, max(last_block, 0)))
+
+        _SyncWindow(Address, Apikey, Action, StartBlock, EndBlock)
+    except EtherscanError as e:
+        print(e)
+        return None
 
-        for tx in transactions:
-            if tx["input"] == "0x" and tx["value"] != "0":
-                WalletTransactions.append({
-                    'Transaction Hash': tx['hash'],
-                    'From': tx['from'],
-                    'To': tx['to'],
-                    'Transaction Value': int(tx['value']) / 1e18,
-                    'Transaction Fee': (int(tx['gasPrice']) * int(tx['gasUsed'])) / 1e18,
-                    'Date': pd.to_datetime(int(tx['timeStamp']), unit='s').strftime('%Y-%m-%d')
-                })
-
-        if len(transactions) < max_txs:
-            break
+    return tx_store.LoadTransactions(Address, Action, StartBlock, EndBlock)
+
+# Fetch the part of a block window not already stored by an earlier windowed fetch
+def _SyncWindow(Address, Apikey, Action, StartBlock, EndBlock):
+    stored = tx_store.GetWindowRange(Address, Action, StartBlock)
+    if stored is not None:
+        if stored[1] >= EndBlock:
+            return
+        StartBlock = stored[1] + 1
+
+    if EndBlock == 99999999:
+        EndBlock = GetLatestBlock(Apikey)
+    pages = list(IterWalletPagesParallel(Address, Apikey, Action, StartBlock, EndBlock))
+    tx_store.StoreWindow(Address, Action, [tx for page in pages for tx in page], StartBlock, EndBlock)
+
+# Largest wei amount the hi/lo limbs can hold exactly; larger (spam token) amounts are clamped to it
+_Max_Wei = (1 << 127) - 1
+
+# Split decimal wei strings into exact integer limbs: value = Value Hi * 2**64 + Value Lo
+def _SplitWei(Values):
+    values = [min(int(value), _Max_Wei) for value in Values]
+    hi = np.fromiter((value >> 64 for value in values), dtype=np.int64, count=len(values))
+    lo = np.fromiter((value & 0xFFFFFFFFFFFFFFFF for value in values), dtype=np.uint64, count=len(values))
+    return hi, lo
+
+# Lower-case address columns once and dictionary-encode them with one shared set of categories
+def _EncodeAddresses(*Columns):
+    lowered = [column.str.lower().to_numpy() for column in Columns]
+    categories = pd.unique(np.concatenate(lowered)) if lowered[0].size else []
+    return [pd.Categorical(column, categories=categories) for column in lowered]
+
+# Pack 0x-prefixed transaction hashes into fixed-width 32-byte values
+def _EncodeHashes(Hashes):
+    buffer = bytes.fromhex("".join(h[2:] for h in Hashes))
+    array = pa.FixedSizeBinaryArray.from_buffers(pa.binary(32), len(Hashes), [None, pa.py_buffer(buffer)])
+    return pd.arrays.ArrowExtensionArray(array)
+
+# Columns shared by the parsed ETH and ERC-20 transaction frames.
+# Addresses are lower-cased categoricals, hashes 32-byte binaries and amounts exact wei limbs,
+# alongside float values in ETH / token units for charting.
+def _ParseCommonColumns(Raw, *ExtraAddressColumns):
+    addresses = _EncodeAddresses(Raw['from'], Raw['to'], *(Raw[column] for column in ExtraAddressColumns))
+    hi, lo = _SplitWei(Raw['value'])
+    columns = {
+        'Transaction Hash': _EncodeHashes(Raw['hash'].tolist()),
+        'From': addresses[0],
+        'To': addresses[1],
+        'Value Hi': hi,
+        'Value Lo': lo,
+        'Transaction Fee': (Raw['gasPrice'].astype(float) * Raw['gasUsed'].astype(float)).to_numpy() / 1e18,
+        'Date': pd.to_datetime(Raw['timeStamp'].astype('int64').to_numpy(), unit='s'),
+        'Block Number': Raw['blockNumber'].astype('int64').to_numpy(),
+    }
+    return columns, addresses[2:]
+
+# Turn raw txlist rows (a page or the stored history) into typed columns in one vectorized pass,
+# keeping plain ETH transfers with a non-zero value
+def ParseTransactions(Raw):
+    Raw = Raw[(Raw['input'] == "0x") & (Raw['value'] != "0")]
+    columns, _ = _ParseCommonColumns(Raw)
+    columns['Transaction Value'] = Raw['value'].astype(float).to_numpy() / 1e18
+    return pd.DataFrame(columns)[[
+        'Transaction Hash', 'From', 'To', 'Transaction Value', 'Value Hi', 'Value Lo',
+        'Transaction Fee', 'Date', 'Block Number'
+    ]]
+
+# Turn raw tokentx rows into typed columns in one vectorized pass, keeping non-zero transfers.
+# Token metadata comes from the token registry: contracts seen for the first time are registered from
+# their first row, and decimals are scaled once per contract rather than once per row.
+def ParseERC20Transactions(Raw):
+    Raw = Raw[Raw['value'] != "0"]
+    columns, (contracts,) = _ParseCommonColumns(Raw, 'contractAddress')
+    used, first, position = np.unique(contracts.codes, return_index=True, return_inverse=True)
+    token_contracts = contracts.categories[used] if len(used) else pd.Index([], dtype=object)
+    token_registry.RegisterTokens(pd.DataFrame({
+        'Token Symbol': Raw['tokenSymbol'].to_numpy()[first],
+        'Token Name': Raw['tokenName'].to_numpy()[first],
+        'Token Decimal': pd.to_numeric(Raw['tokenDecimal'].iloc[first], errors='coerce').fillna(0).astype('int64').to_numpy(),
+    }, index=token_contracts))
+    tokens = token_registry.GetTokens(token_contracts)
+    decimals = tokens['Token Decimal'].to_numpy(dtype='int64')
+    columns.update({
+        'Token Symbol': tokens['Token Symbol'].to_numpy()[position],
+        'Token Name': tokens['Token Name'].to_numpy()[position],
+        'Token Decimal': decimals[position],
+        'Contract Address': contracts,
+        'Transaction Value': Raw['value'].astype(float).to_numpy() / np.power(10.0, decimals)[position],
+    })
+    return pd.DataFrame(columns)[[
+        'Transaction Hash', 'From', 'To', 'Token Symbol', 'Token Name', 'Token Decimal', 'Contract Address',
+        'Transaction Value', 'Value Hi', 'Value Lo', 'Transaction Fee', 'Date', 'Block Number'
+    ]]
+
+# Retrieve normal ETH transactions, optionally only those between StartDate and EndDate (inclusive dates)
+def GetWalletTransactions(Address, Apikey, StartDate=None, EndDate=None):
+    try:
+        StartBlock, EndBlock = GetBlockRange(StartDate, EndDate, Apikey)
+    except EtherscanError as e:
+        print(e)
+        return None
+    History = SyncWalletHistory(Address, Apikey, "txlist", StartBlock, EndBlock)
+    if History is None:
+        return None
+    return ParseTransactions(History)
+
+# Parser for each Etherscan history action
+_Parsers = {"txlist": ParseTransactions, "tokentx": ParseERC20Transactions}
+
+# Streaming mode: fold a wallet's history into its rollup chunk by chunk instead of loading it whole.
+# Stored rows are read back in block-aligned chunks, then new blocks are fetched page by page,
+# stored and folded in, so peak memory is bounded by the chunk/page size and the number of distinct
+# counterparties rather than by history length. Chunks go through a rollups.RollupBuilder, which yields
+# progress (running daily totals and assets) after every chunk, and the finished rollup is yielded last.
+# The build goes through the wallet cache's single-flight (see WalletCache.IterOrLoad): sessions asking for
+# the same wallet at the same time share one download, and a rollup synced within Wallet_Cache_TTL is reused.
+# Progressive rendering uses the same pipeline with CounterpartyDays (per-day counterparty totals, as in
+# non-streaming rollups) and Parallel (pages fetched by IterWalletPagesParallel, whose buffered ranges
+# are not memory-bounded).
+def IterWalletRollup(Address, Apikey, Action, CounterpartyDays=False, Parallel=False):
+    key = (Address.lower(), f"rollup:{Action}")
+    return wallet_cache.GetWalletCache().IterOrLoad(
+        key, lambda: _BuildWalletRollup(Address, Apikey, Action, key, CounterpartyDays, Parallel)
+    )
 
-        page += 1
-        time.sleep(0.25)  
+# Extend the cached rollup (or a new one) with the stored rows and then the newly fetched pages,
+# yielding the builder after every chunk and the finished rollup last (see IterWalletRollup)
+def _BuildWalletRollup(Address, Apikey, Action, Key, CounterpartyDays, Parallel):
+    rollup = wallet_cache.GetWalletCache().Peek(Key)
+    if rollup is None:
+        rollup = rollups.WalletRollup(Address, CounterpartyDays=CounterpartyDays)
+    builder = rollups.RollupBuilder(rollup)
+    parse = _Parsers[Action]
+
+    stored_block = tx_store.GetLastBlock(Address, Action)
+    for raw in tx_store.IterTransactions(Address, Action, AfterBlock=builder.LastBlock, UpToBlock=stored_block):
+        yield builder.Append(parse(raw))
+
+    last_block = max(stored_block, builder.LastBlock)
+    pages = IterWalletPagesParallel if Parallel else IterWalletPages
+    try:
+        for transactions in pages(Address, Apikey, Action, StartBlock=last_block + 1):
+            tx_store.AppendTransactions(Address, Action, transactions, int(transactions[-1]["blockNumber"]))
+            yield builder.Append(parse(pd.DataFrame.from_records(transactions, columns=tx_store.Raw_Fields)))
+    except EtherscanError as e:
+        print(e)
+
+    yield builder.Rollup()
+
+# Run the streaming pipeline to completion and return the wallet's rollup
+def StreamWalletRollup(Address, Apikey, Action, CounterpartyDays=False):
+    rollup = None
+    for rollup in IterWalletRollup(Address, Apikey, Action, CounterpartyDays=CounterpartyDays):
+        pass
+    return rollup
+
+# Per-wallet snapshot: loads each transaction history at most once (through the process-wide wallet cache)
+# and shares it across every chart and metric
+# With Streaming (default: the Streaming_Mode setting) rollups are built by the bounded-memory streaming
+# pipeline and the raw transaction frames are only loaded if something asks for them.
+# StartDate/EndDate (inclusive dates, either optional) limit every dataset to that window; windowed
+# snapshots always load the window's transactions directly and build their own rollups.
+# TokenVerdicts passes in spam verdicts already computed elsewhere (e.g. by the batch fetch stage).
+class WalletSnapshot:
+    def __init__(self, Address, Apikey, Streaming=None, StartDate=None, EndDate=None, TokenVerdicts=None):
+        self.Address = Address
+        self.Apikey = Apikey
+        self.StartDate = StartDate
+        self.EndDate = EndDate
+        self.Windowed = StartDate is not None or EndDate is not None
+        self.Streaming = (
+            os.getenv("Streaming_Mode", "0") == "1" if Streaming is None else Streaming
+        ) and not self.Windowed
+        self._Transactions = None
+        self._ERC20Transactions = None
+        self._FirstActivity = None
+        self._Metrics = None
+        self._ERC20Balances = None
+        self._TokenVerdicts = TokenVerdicts
+        self._Rollup = None
+        self._ERC20Rollup = None
+
+    # Normal ETH transactions, fetched on first access
+    @property
+    def Transactions(self):
+        if self._Transactions is None:
+            self._Transactions = wallet_cache.GetWalletCache().GetOrLoad(
+                self._CacheKey("txlist"),
+                lambda: GetWalletTransactions(self.Address, self.Apikey, self.StartDate, self.EndDate)
+            )
+        return self._Transactions
+
+    # ERC-20 token transfers, fetched on first access
+    @property
+    def ERC20Transactions(self):
+        if self._ERC20Transactions is None:
+            self._ERC20Transactions = wallet_cache.GetWalletCache().GetOrLoad(
+                self._CacheKey("tokentx"),
+                lambda: GetWalletERC20Transactions(self.Address, self.Apikey, self.StartDate, self.EndDate)
+            )
+        return self._ERC20Transactions
+
+    # Build the rollup for Action ("txlist" or "tokentx") from the history page by page, yielding progress
+    # after every chunk and the finished rollup last (see IterWalletRollup), so views can draw a preview
+    # while the rest downloads.
+    # Yields nothing if the rollup is already built or was synced within Wallet_Cache_TTL; windowed
+    # snapshots build theirs in one go on access.
+    def IterRollup(self, Action):
+        attribute = "_Rollup" if Action == "txlist" else "_ERC20Rollup"
+        if getattr(self, attribute) is not None or self.Windowed:
+            return
+        cached = wallet_cache.GetWalletCache().Get(self._CacheKey(f"rollup:{Action}"))
+        if cached is not None:
+            setattr(self, attribute, cached)
+            return
+        rollup = None
+        for rollup in IterWalletRollup(
+            self.Address, self.Apikey, Action, CounterpartyDays=not self.Streaming, Parallel=not self.Streaming
+        ):
+            yield rollup
+        setattr(self, attribute, rollup)
+
+    # Daily rollup of the ETH transactions, built (or extended with new blocks) on first access
+    @property
+    def Rollup(self):
+        if self._Rollup is None and self.Streaming:
+            self._Rollup = StreamWalletRollup(self.Address, self.Apikey, "txlist")
+        if self._Rollup is None and self.Windowed:
+            self._Rollup = rollups.WalletRollup(self.Address).Append(self.Transactions)
+        if self._Rollup is None:
+            self._Rollup = rollups.GetWalletRollup(self.Address, "txlist", self.Transactions)
+        return self._Rollup
+
+    # Daily rollup of the ERC-20 transfers, built (or extended with new blocks) on first access
+    @property
+    def ERC20Rollup(self):
+        if self._ERC20Rollup is None and self.Streaming:
+            self._ERC20Rollup = StreamWalletRollup(self.Address, self.Apikey, "tokentx")
+        if self._ERC20Rollup is None and self.Windowed:
+            self._ERC20Rollup = rollups.WalletRollup(self.Address).Append(self.ERC20Transactions)
+        if self._ERC20Rollup is None:
+            self._ERC20Rollup = rollups.GetWalletRollup(self.Address, "tokentx", self.ERC20Transactions)
+        return self._ERC20Rollup
+
+    # Wallet cache key for one of the snapshot's datasets
+    def _CacheKey(self, Action):
+        if not self.Windowed:
+            return (self.Address.lower(), Action)
+        return (self.Address.lower(), Action, str(self.StartDate), str(self.EndDate))
+
+    # Spam verdict for every ERC-20 token of the wallet (see token_filter.ClassifyTokens), computed on first access
+    @property
+    def TokenVerdicts(self):
+        if self._TokenVerdicts is None:
+            self._TokenVerdicts = token_filter.ClassifyTokens(self.ERC20Rollup, GetTokenPrices)
+        return self._TokenVerdicts
+
+    # Contracts of the wallet's real tokens: every token except spam, unless Token_Filter is 0
+    @property
+    def RealTokens(self):
+        if not token_filter.FilterEnabled():
+            return self.ERC20Rollup.Assets.index
+        return self.TokenVerdicts.index[~self.TokenVerdicts["Spam"].astype(bool)]
+
+    # Real token contracts with the given symbol (spam clones of a real token's symbol are left out)
+    def TokenAssets(self, Symbol):
+        return self.ERC20Rollup.AssetsForSymbol(Symbol).intersection(self.RealTokens)
+
+    # Symbols of the wallet's real tokens
+    @property
+    def TokenSymbols(self):
+        return self.ERC20Rollup.Assets.loc[self.RealTokens, "Token Symbol"].unique()
+
+    # ERC-20 holdings derived from the transfer history, computed on first access
+    @property
+    def ERC20Balances(self):
+        if self._ERC20Balances is None:
+            self._ERC20Balances = GetWalletERC20Balances(self)
+        return self._ERC20Balances
+
+    # Time of the wallet's first transaction, read from the stored history when it has been synced
+    # (a one-row request otherwise)
+    @property
+    def FirstActivity(self):
+        if self._FirstActivity is None:
+            if not self.Windowed:
+                self.Rollup  # syncs the whole ETH history into the store
+            if tx_store.GetLastBlock(self.Address, "txlist") >= 0:
+                first = tx_store.GetFirstTimestamp(self.Address, "txlist")
+                self._FirstActivity = datetime.fromtimestamp(first) if first is not None else None
+            elif self.Windowed:
+                self._FirstActivity = GetWalletFirstActivity(self.Address, self.Apikey)
+        return self._FirstActivity
+
+    # Live ETH balance, shared through the wallet cache so reruns do not refetch it
+    @property
+    def Balance(self):
+        return wallet_cache.GetWalletCache().GetOrLoad(
+            (self.Address.lower(), "balance"), lambda: GetWalletBalance(self.Address, self.Apikey)
+        )
 
-    return pd.DataFrame(WalletTransactions)
+    # Wallet metrics (see GetWalletMetrics), computed on first access
+    @property
+    def Metrics(self):
+        if self._Metrics is None:
+            self._Metrics = GetWalletMetrics(self)
+        return self._Metrics
+
+    # Wallet age in days
+    @property
+    def Age(self):
+        return self.Metrics["Age"]
+
+# Individual transfers of ETH (Action "txlist") or of the given token contracts ("tokentx") between
+# the dates Start and End (inclusive), as Transaction Value / Transaction Fee indexed by Date, for
+# zoomed-in charts. Only that window is loaded, served from the local store once the history is synced.
+def GetTransferPoints(Snapshot, Action, Start, End, Assets=None):
+    loader = GetWalletTransactions if Action == "txlist" else GetWalletERC20Transactions
+    df = loader(Snapshot.Address, Snapshot.Apikey, Start, End)
+    if df is None:
+        return pd.DataFrame(columns=["Transaction Value", "Transaction Fee"], index=pd.DatetimeIndex([], name="Date"))
+
+    keep = (df["Date"] >= pd.Timestamp(Start)) & (df["Date"] < pd.Timestamp(End) + pd.Timedelta(days=1))
+    if Assets is not None:
+        keep &= df["Contract Address"].astype(str).isin(list(Assets))
+    return df.loc[keep, ["Date", "Transaction Value", "Transaction Fee"]].set_index("Date")
 
 # Compute daily ETH net flow (inflow - outflow)
-def GetWalletNetFlow(Address, Apikey):
-    Df_WalletTransactions = pd.DataFrame(GetWalletTransactions(Address, Apikey))
-
-    Df_WalletTransactions['Date'] = pd.to_datetime(Df_WalletTransactions['Date'])
-    out = (Df_WalletTransactions
-        .loc[Df_WalletTransactions['From'].str.lower()==Address.lower()]
-        .groupby(Df_WalletTransactions['Date'].dt.date)
-        .sum(numeric_only=True))
-    inc = (Df_WalletTransactions
-        .loc[Df_WalletTransactions['To'].str.lower()==Address.lower()]
-        .groupby(Df_WalletTransactions['Date'].dt.date)
-        .sum(numeric_only=True))
-    
-    out.index = pd.to_datetime(out.index)
-    inc.index = pd.to_datetime(inc.index)
-    
-    diff = out.subtract(inc, fill_value=0)
-    
-    return diff[['Transaction Value']]
+def GetWalletNetFlow(Snapshot):
+    daily = Snapshot.Rollup.DailyTotals()
+    return (daily['Outflow'] - daily['Inflow']).to_frame('Transaction Value')
+
+# Rename rollup counterparty totals to the layout used by the treemaps
+def _CounterpartyTable(Totals):
+    return (Totals
+            .rename(columns={'Inflow': 'Incoming Transaction Values', 'Outflow': 'Outgoing Transaction Values'})
+            .rename_axis('Wallet')
+            .reset_index()[['Wallet', 'Outgoing Transaction Values', 'Incoming Transaction Values']])
+
+# Get the top K counterparties of ETH (or of an ERC-20 token symbol) in one direction
+# ("Incoming" or "Outgoing"), optionally for a date range, with both totals for each counterparty.
+# With USD, every day's transfers are valued at that day's price (see GetUSDPrices).
+def WalletTopCounterparties(Snapshot, Direction, K=10, Token=None, Start=None, End=None, USD=False):
+    if Token is None:
+        Rollup, Assets = Snapshot.Rollup, ['ETH']
+    else:
+        Rollup = Snapshot.ERC20Rollup
+        Assets = Snapshot.TokenAssets(Token)
+    column = {'Incoming': 'Inflow', 'Outgoing': 'Outflow'}[Direction]
+    Prices = GetUSDPrices if USD else None
+    return _CounterpartyTable(Rollup.TopCounterparties(column, K, Assets, Start, End, Prices))
+
+# Compute every ERC-20 holding from the wallet's transfer rollup, in exact base units.
+# Live tokenbalance calls are only made for contracts listed in Reconcile (default: the comma-separated
+# Reconcile_Token_Contracts setting, for rebasing or fee-on-transfer tokens) and for any contract whose
+# derived balance comes out negative, which transfer history alone cannot explain.
+# A windowed snapshot only sees part of the history, so its tokens' holdings come from the full rollup
+# (cached, or extended from the local store with any new blocks) once the whole token history has been
+# synced, and are checked live only when it has not.
+# Spam tokens (see WalletSnapshot.RealTokens) are left out before any of this work.
+def GetWalletERC20Balances(Snapshot, Reconcile=None):
+    columns = ["Contract Address", "Token Symbol", "Token Name", "Token Decimal", "Raw Balance", "Balance"]
+    Rollup = Snapshot.ERC20Rollup
+    Assets = Rollup.Assets.loc[Snapshot.RealTokens]
+    if Assets.empty:
+        return pd.DataFrame(columns=columns)
+
+    if Reconcile is None:
+        Reconcile = os.getenv("Reconcile_Token_Contracts", "").split(",")
+    Reconcile = {contract.strip().lower() for contract in Reconcile if contract.strip()}
+    Holdings = Rollup.Holdings
+    if Snapshot.Windowed and tx_store.GetLastBlock(Snapshot.Address, "tokentx") >= 0:
+        Holdings = StreamWalletRollup(
+            Snapshot.Address, Snapshot.Apikey, "tokentx",
+            CounterpartyDays=os.getenv("Streaming_Mode", "0") != "1"
+        ).Holdings
+    elif Snapshot.Windowed:
+        Reconcile.update(Assets.index)
+
+    Balances = Assets[["Token Symbol", "Token Name", "Token Decimal"]].rename_axis("Contract Address").copy()
+    Balances["Raw Balance"] = pd.Series(
+        [Holdings.get(contract, 0) for contract in Balances.index], index=Balances.index, dtype=object
+    )
 
-# Get top senders and receivers of ETH
-def WalletTopReceiversSenders(Address, Apikey):
-    Df_WalletTransactions = GetWalletTransactions(Address, Apikey).loc[:, ["From", "To", "Transaction Value"]]
+    for contract, token in Balances.iterrows():
+        if contract in Reconcile or token["Raw Balance"] < 0:
+            r = api_client.EtherscanGet(
+                f"{GetEtherscanURL()}?module=account&action=tokenbalance&contractaddress={contract}"
+                f"&address={Snapshot.Address}&tag=latest&apikey={Snapshot.Apikey}"
+            )
+            Balances.at[contract, "Raw Balance"] = int(r.json()["result"])
+
+    Balances["Balance"] = [
+        raw_balance / 10 ** int(decimals)
+        for raw_balance, decimals in zip(Balances["Raw Balance"], Balances["Token Decimal"])
+    ]
+
+    return Balances.reset_index()[columns]
 
-    out = (Df_WalletTransactions
-            .loc[Df_WalletTransactions['From'].str.lower()==Address.lower()]
-            .groupby(Df_WalletTransactions['To'])
-            .sum(numeric_only=True).reset_index())
+# CoinMarketCap request headers
+def _CoinMarketCapHeaders():
+    return {
+        'Accepts': 'application/json',
+        'X-CMC_PRO_API_KEY': config.Get("CoinMarketCap_API_Key"),
+    }
 
-    inc = (Df_WalletTransactions
-            .loc[Df_WalletTransactions['To'].str.lower()==Address.lower()]
-            .groupby(Df_WalletTransactions['From'])
-            .sum(numeric_only=True).reset_index())
+# Live USD quotes from CoinMarketCap for many keys at once, by Parameter "symbol" or "id", in batched requests.
+# Quotes (including "no price" answers) are cached for Price_Cache_TTL seconds under (CacheName, key).
+# Keys of batches CoinMarketCap could not answer (unreachable, or refusing the key) are left out.
+def _GetQuotes(Parameter, Keys, CacheName):
+    Prices = {}
+    missing = []
+
+    with _Price_Cache_Lock:
+        for key in Keys:
+            if (CacheName, key) in _Price_Cache:
+                Prices[key] = _Price_Cache[(CacheName, key)]
+            else:
+                missing.append(key)
+
+    url = f"{GetCoinMarketCapURL()}/v1/cryptocurrency/quotes/latest"
+    missing = sorted(set(missing))
+    fetched = {}
+
+    for i in range(0, len(missing), _Price_Batch_Size):
+        batch = missing[i:i + _Price_Batch_Size]
+        parameters = {
+            Parameter: ",".join(str(key) for key in batch),
+            'convert': 'USD',
+            'skip_invalid': 'true'
+        }
+
+        try:
+            data = api_client.CoinMarketCapGet(url, headers=_CoinMarketCapHeaders(), params=parameters).json()
+        except (requests.RequestException, ValueError) as e:
+            print("CoinMarketCap request failed:", e)
+            continue
+
+        if 'data' not in data:
+            print("Error in response:", data)
+            continue
+
+        for key in batch:
+            try:
+                price = data['data'][str(key)]['quote']['USD']['price']
+                fetched[key] = round(float(price), 6) if price is not None else None
+            except (KeyError, TypeError):
+                fetched[key] = None
+
+    with _Price_Cache_Lock:
+        for key, price in fetched.items():
+            _Price_Cache[(CacheName, key)] = price
+
+    Prices.update(fetched)
+    return Prices
+
+# Get live token-to-USD prices by CoinMarketCap ID, in batched requests cached for Price_Cache_TTL seconds
+def GetTokenToUSDPricesByID(ids):
+    return _GetQuotes('id', [int(cmc_id) for cmc_id in ids], "coinmarketcap-id")
+
+# CoinMarketCap's map of listed Ethereum tokens, refreshed after Token_Listing_Recheck seconds
+_Listing_Cache = TTLCache(maxsize=1, ttl=token_registry.GetListingRecheck())
+_Listing_Page_Size = 5000
+
+# Ethereum tokens listed on CoinMarketCap, as contract address -> CoinMarketCap ID, read from its ID map
+# in a few paged requests. None if the map cannot be downloaded.
+def GetCoinMarketCapListings():
+    with _Price_Cache_Lock:
+        if "ethereum" in _Listing_Cache:
+            return _Listing_Cache["ethereum"]
+
+    url = f"{GetCoinMarketCapURL()}/v1/cryptocurrency/map"
+    Listings = {}
+    start = 1
+    while True:
+        parameters = {'listing_status': 'active', 'start': start, 'limit': _Listing_Page_Size, 'aux': 'platform'}
+        try:
+            data = api_client.CoinMarketCapGet(url, headers=_CoinMarketCapHeaders(), params=parameters).json()
+        except (requests.RequestException, ValueError) as e:
+            print("CoinMarketCap request failed:", e)
+            return None
+        if 'data' not in data:
+            print("Error in response:", data)
+            return None
 
-    inc = inc.rename(columns={'From': 'Wallet', 'Transaction Value': 'Incoming Transaction Values'})
-    out = out.rename(columns={'To': 'Wallet', 'Transaction Value': 'Outgoing Transaction Values'})
+        for coin in data['data']:
+            platform = coin.get('platform') or {}
+            if platform.get('slug') == 'ethereum' and platform.get('token_address'):
+                Listings.setdefault(platform['token_address'].lower(), coin['id'])
 
-    MergedTransactions = pd.merge(out, inc, on='Wallet', how='outer')
-    MergedTransactions = MergedTransactions.fillna(0)
-    
-    return MergedTransactions
+        if len(data['data']) < _Listing_Page_Size:
+            break
+        start += _Listing_Page_Size
+
+    with _Price_Cache_Lock:
+        _Listing_Cache["ethereum"] = Listings
+    return Listings
+
+# Get live token-to-USD prices by contract address: each contract's CoinMarketCap ID comes from the token
+# registry (resolved once and stored), then every price is fetched in one batched lookup by ID.
+# Contracts CoinMarketCap does not list get None, so a spam token reusing a real token's symbol is never priced.
+# Contracts whose listing or quote could not be fetched are left out: their price is unknown, not missing.
+def GetTokenPrices(Contracts):
+    Contracts = list(Contracts)
+    ids = token_registry.GetProviderIDs(Contracts, GetCoinMarketCapListings)
+    quotes = GetTokenToUSDPricesByID(sorted({cmc_id for cmc_id in ids.values() if cmc_id}))
+    return {
+        contract: quotes[ids[contract]] if ids[contract] else None
+        for contract in Contracts if contract in ids and (not ids[contract] or ids[contract] in quotes)
+    }
 
-# Get ERC-20 token balance of a specific contract for a wallet
-def Geterc_20WalletBalance(Address, TokenAddress, TokenDecimal, Apikey):
-    r = requests.get(f"https://api.etherscan.io/api?module=account&action=tokenbalance&contractaddress={TokenAddress}&address={Address}&tag=latest&apikey={Apikey}")
-    return float(r.json()["result"]) / (10 ** int(TokenDecimal))
+# CoinMarketCap ID of Ether, the asset key of normal transactions
+_ETH_CMC_ID = 1027
 
-# Get live token-to-USD price using CoinMarketCap
-def GetTokenToUSDPrice(symbol):
-    if not symbol or not re.match(r'^[A-Za-z0-9]+$', symbol):
-        print(f"Skipping invalid token symbol: {symbol}")
+# Daily USD prices of an asset ("ETH" or a token contract) between two dates from CoinMarketCap's historical
+# quotes, as (ISO date, price) rows. None if they cannot be downloaded or the token's listing is unknown.
+def _DownloadDailyPrices(Asset, Start, End):
+    cmc_id = _ETH_CMC_ID if Asset == "ETH" else token_registry.GetProviderIDs([Asset], GetCoinMarketCapListings).get(Asset)
+    if not cmc_id:
         return None
 
-    url = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest"
+    url = f"{GetCoinMarketCapURL()}/v2/cryptocurrency/quotes/historical"
     parameters = {
-        'symbol': symbol.upper(),
-        'convert': 'USD'
-    }
-    headers = {
-        'Accepts': 'application/json',
-        'X-CMC_PRO_API_KEY': CoinMarketCap_API_Key,
+        'id': cmc_id,
+        'time_start': f"{Start.isoformat()}T00:00:00Z",
+        'time_end': f"{End.isoformat()}T23:59:59Z",
+        'interval': 'daily',
+        'count': 10000,
+        'convert': 'USD',
     }
-
-    response = requests.get(url, headers=headers, params=parameters)
-    data = response.json()
-
     try:
-        price = data['data'][symbol.upper()]['quote']['USD']['price']
-        return round(float(price), 6) if price is not None else None
-    except KeyError:
+        data = api_client.CoinMarketCapGet(url, headers=_CoinMarketCapHeaders(), params=parameters).json()
+    except (requests.RequestException, ValueError) as e:
+        print("CoinMarketCap request failed:", e)
+        return None
+    if not isinstance(data.get('data'), dict):
         print("Error in response:", data)
         return None
 
-# Get all ERC-20 token transfers with pagination
-def GetWalletERC20Transactions(Address, Apikey):
-    WalletERC20Transactions = []
-    page = 1
-    max_txs = 10000  
-
-    while True:
-        url = (
-            f"https://api.etherscan.io/api?module=account&action=tokentx"
-            f"&address={Address}&page={page}&offset={max_txs}"
-            f"&startblock=0&endblock=99999999&sort=asc&apikey={Apikey}"
-        )
-        r = requests.get(url)
-
-        if r.status_code != 200:
-            print("API request failed:", r.status_code)
-            return None
-
-        transactions = r.json().get("result", [])
-
-        if not transactions:
-            break
-
-        for tx in transactions:
-            if tx["value"] != "0":
-                WalletERC20Transactions.append({
-                    'Transaction Hash': tx['hash'],
-                    'From': tx['from'],
-                    'To': tx['to'],
-                    'Token Symbol': tx['tokenSymbol'],
-                    'Token Name': tx['tokenName'],
-                    'Token Decimal': tx['tokenDecimal'],
-                    'Contract Address': tx['contractAddress'],
-                    'Transaction Value': int(tx['value']) / (10 ** int(tx['tokenDecimal'])),
-                    'Transaction Fee': (int(tx['gasPrice']) * int(tx['gasUsed'])) / 1e18,
-                    'Date': pd.to_datetime(int(tx['timeStamp']), unit='s').strftime('%Y-%m-%d')
-                })
-
-        if len(transactions) < max_txs:
-            break
-
-        page += 1
-        time.sleep(0.25)  
+    quotes = data['data'].get(str(cmc_id), {}).get('quotes', [])
+    return [
+        (quote['timestamp'][:10], float(quote['quote']['USD']['price']))
+        for quote in quotes if quote.get('quote', {}).get('USD', {}).get('price') is not None
+    ]
 
-    return pd.DataFrame(WalletERC20Transactions)
+# USD price of every (asset, date) pair, where assets are "ETH" or token contracts: each asset's daily price
+# as of that date from the shared price table (see price_history), in one as-of join. Today's live quote is
+# added to the table, so today's transfers (and whole-history totals, whose date is NaT) use it and assets
+# without price history fall back to it.
+def GetUSDPrices(Assets, Dates):
+    Assets = np.asarray(Assets, dtype=object)
+    today = pd.Timestamp(datetime.now(timezone.utc).date())
+    Dates = pd.DatetimeIndex(Dates).fillna(today)
+    if not len(Dates):
+        return np.array([], dtype=float)
+
+    assets = pd.unique(Assets)
+    table = price_history.GetPriceTable(assets, Dates.min(), Dates.max(), _DownloadDailyPrices)
+
+    if not price_history.Offline():
+        live = GetTokenPrices([asset for asset in assets if asset != "ETH"])
+        if "ETH" in assets:
+            live["ETH"] = GetTokenToUSDPricesByID([_ETH_CMC_ID]).get(_ETH_CMC_ID)
+        live = {asset: price for asset, price in live.items() if price is not None}
+        if live:
+            today_prices = pd.DataFrame({
+                'Asset': pd.Series(list(live), dtype=object),
+                'Date': pd.Series([today] * len(live), dtype='datetime64[ns]'),
+                'Price': pd.Series(list(live.values()), dtype=float),
+            })
+            table = today_prices if table.empty else pd.concat([table, today_prices], ignore_index=True)
+
+    return price_history.PricesAsOf(table, Assets, Dates)
+
+# Value the Columns (default: all) of a Date-indexed frame of Asset amounts in USD at each date's price
+def ToUSD(Frame, Asset, Columns=None):
+    Columns = list(Frame.columns) if Columns is None else list(Columns)
+    Converted = Frame.copy()
+    Converted[Columns] = Converted[Columns].mul(GetUSDPrices([Asset] * len(Frame), Frame.index), axis=0)
+    return Converted
+
+# Get all ERC-20 token transfers, optionally only those between StartDate and EndDate (inclusive dates)
+def GetWalletERC20Transactions(Address, Apikey, StartDate=None, EndDate=None):
+    try:
+        StartBlock, EndBlock = GetBlockRange(StartDate, EndDate, Apikey)
+    except EtherscanError as e:
+        print(e)
+        return None
+    History = SyncWalletHistory(Address, Apikey, "tokentx", StartBlock, EndBlock)
+    if History is None:
+        return None
+    return ParseERC20Transactions(History)
 
-# Compute ERC-20 net flow by token symbol
-def GetWalletERC20NetFlow(Address, Apikey):
-    df = GetWalletERC20Transactions(Address, Apikey)
-    if df is None or df.empty:
+# Compute ERC-20 net flow by token symbol, for the wallet's real (non-spam) tokens
+def GetWalletERC20NetFlow(Snapshot):
+    Rollup = Snapshot.ERC20Rollup
+    daily = Rollup.Daily[Rollup.Daily.index.get_level_values('Asset').isin(Snapshot.RealTokens)]
+    if daily.empty:
         return pd.DataFrame()
 
-    df['Date'] = pd.to_datetime(df['Date'])
-    addr = Address.lower()
-
-    out = (
-        df[df['From'].str.lower() == addr]
-        .groupby([df['Date'].dt.date, 'Token Symbol'])['Transaction Value']
-        .sum()
-        .unstack(fill_value=0)
-    )
-
-    inc = (
-        df[df['To'].str.lower() == addr]
-        .groupby([df['Date'].dt.date, 'Token Symbol'])['Transaction Value']
-        .sum()
-        .unstack(fill_value=0)
-    )
-
-    out.index = pd.to_datetime(out.index)
-    inc.index = pd.to_datetime(inc.index)
-
-    net_flow = out.subtract(inc, fill_value=0)
-
-    return net_flow
-
-# Get top receivers/senders of a specific ERC-20 token
-def WalletERC20TopReceiversSenders(Address, Apikey, token):
-    df = GetWalletERC20Transactions(Address, Apikey)
-    if df is None or df.empty: 
-        return pd.DataFrame(columns=['Wallet','Outgoing Transaction Values','Incoming Transaction Values'])
-    df = df[df['Token Symbol']==token]
-    addr = Address.lower()
-    out = df[df['From'].str.lower()==addr] \
-        .groupby('To')['Transaction Value'].sum() \
-        .nlargest(10) \
-        .reset_index(name='Outgoing Transaction Values') \
-        .rename(columns={'To':'Wallet'})
-    inc = df[df['To'].str.lower()==addr] \
-        .groupby('From')['Transaction Value'].sum() \
-        .nlargest(10) \
-        .reset_index(name='Incoming Transaction Values') \
-        .rename(columns={'From':'Wallet'})
-    return pd.merge(out, inc, on='Wallet', how='outer').fillna(0)
-
-# Get wallet age in days based on first transaction timestamp
-def GetWalletAge(Address, Apikey):
-    r = requests.get(
-        f"https://api.etherscan.io/api?module=account&action=txlist"
+    symbols = Rollup.Assets['Token Symbol'].reindex(daily.index.get_level_values('Asset')).to_numpy()
+    net_flow = (daily['Outflow'] - daily['Inflow']).to_numpy()
+
+    return (pd.DataFrame({
+                'Date': daily.index.get_level_values('Date'),
+                'Token Symbol': symbols,
+                'Net Flow': net_flow,
+            })
+            .groupby(['Date', 'Token Symbol'])['Net Flow'].sum()
+            .unstack(fill_value=0))
+
+# Time of a wallet's first transaction, read with a single one-row txlist request (None for unused wallets)
+def GetWalletFirstActivity(Address, Apikey):
+    r = api_client.EtherscanGet(
+        f"{GetEtherscanURL()}?module=account&action=txlist"
         f"&address={Address}&startblock=0&endblock=99999999"
         f"&page=1&offset=1&sort=asc&apikey={Apikey}"
     )
     transaction = r.json()["result"]
-    
+
     if not transaction:
-        return 0
+        return None
 
-    creation_time = datetime.fromtimestamp(int(transaction[0]['timeStamp']))
-    
-    Age = (datetime.now() - creation_time).days
+    return datetime.fromtimestamp(int(transaction[0]['timeStamp']))
+
+# Wallet metrics computed once from the snapshot's ETH rollup: age in days, first activity (the wallet's
+# first transaction), last activity (last day with an ETH transfer), transfer count, transfers per day,
+# ETH volume, ETH fees and the live ETH balance. Tx Per Day is taken over the snapshot's date window
+# when it has one, otherwise over the wallet's age.
+def GetWalletMetrics(Snapshot):
+    daily = Snapshot.Rollup.Daily
+    first_activity = Snapshot.FirstActivity
+    age = (datetime.now() - first_activity).days if first_activity is not None else 0
+    dates = daily.index.get_level_values("Date")
+
+    tx_count = int(daily['Tx Count'].sum())
+    days = age
+    if Snapshot.StartDate is not None:
+        end = Snapshot.EndDate or datetime.now(timezone.utc).date()
+        days = min(age, (end - Snapshot.StartDate).days + 1)
+
+    return {
+        "Age": age,
+        "First Activity": first_activity,
+        "Last Activity": dates.max().to_pydatetime() if len(dates) else None,
+        "Tx Count": tx_count,
+        "Tx Per Day": tx_count / days if days > 0 else 0,
+        "Volume": float(daily['Volume'].sum()),
+        "Fees": float(daily['Fees'].sum()),
+        "Balance": Snapshot.Balance,
+    }
 
-    return Age
+# Calculate average number of transactions per day (over the snapshot's date window, if it has one)
+def Gettxperday(Snapshot):
+    return Snapshot.Metrics["Tx Per Day"]
 
-# Calculate average number of transactions per day
-def Gettxperday(Address, Apikey):
-    num_txns = (len(GetWalletTransactions(Address, Apikey)))
-    wallet_age_days = GetWalletAge(Address, Apikey) 
-    if wallet_age_days > 0:
-        return num_txns / wallet_age_days
-    else:
-        return 0
-    
 # Calculate total ETH volume moved by the wallet
-def GetVolume(Address, Apikey):
-    return GetWalletTransactions(Address, Apikey)['Transaction Value'].sum()
-
+def GetVolume(Snapshot):
+    return Snapshot.Metrics["Volume"]